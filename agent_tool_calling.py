@@ -1,9 +1,4 @@
-from langchain_core.messages import HumanMessage
-from langgraph.checkpoint.memory import MemorySaver
 from dotenv import load_dotenv
-from config import llm
-from langgraph.prebuilt import create_react_agent
-from langchain_core.tools import StructuredTool
 from langchain_core.prompts import ChatPromptTemplate
 
 
@@ -11,9 +6,6 @@ from langchain_core.prompts import ChatPromptTemplate
 
 load_dotenv()
 
-llm = llm
-checkpointer = MemorySaver()
-
 router_prompt =ChatPromptTemplate.from_template( """
 You are the ROUTER (Supervisor).
 
@@ -37,12 +29,6 @@ Give me a valid json Format as response:
 ```
 """)
 
-Router = create_react_agent(
-    model=llm,
-    tools=[],                # no tools
-    checkpointer=checkpointer,
-    prompt=router_prompt
-)
 
 safety_prompt =ChatPromptTemplate.from_template( """
 You are the SafetyGuardian Agent and you should analyze, make decision according to the detail that is provided.
@@ -63,12 +49,6 @@ Give me Valid Json Format as response:
 }}```
 """)
 
-SafetyGuardian = create_react_agent(
-    model=llm,
-    tools=[],
-    checkpointer=checkpointer,
-    prompt=safety_prompt
-)
 
 draftsman_prompt =ChatPromptTemplate.from_template( """
 You are the Draftsman Agent and you should analyze, make decision according to the detail that is provided.
@@ -88,12 +68,6 @@ Give me Valid Json Format as response:
 }}```
 """)
 
-Draftsman = create_react_agent(
-    model=llm,
-    tools=[],
-    checkpointer=checkpointer,
-    prompt=draftsman_prompt
-)
 
 clinical_prompt = ChatPromptTemplate.from_template("""
 You are the ClinicalCritic Agent and you should analyze, make decision according to the detail that is provided.
@@ -115,13 +89,3 @@ Give me Valid Json Format as response:
 }}
 ```
 """)
-
-ClinicalCritic = create_react_agent(
-    model=llm,
-    tools=[],
-    checkpointer=checkpointer,
-    prompt=clinical_prompt
-)
-
-
-
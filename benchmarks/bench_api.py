@@ -0,0 +1,148 @@
+"""
+End-to-end latency and throughput of the API and MCP tool, fully offline.
+
+Serves the real main.api on a local port with LLM_PROVIDER=fake (deterministic
+canned answers after a fixed latency) and an in-memory checkpointer, then
+drives each scenario at every concurrency level and reports p50/p95/p99
+latency and requests/s:
+
+    python -m benchmarks.bench_api --latency 0.05 --requests 200 --concurrency 1 8 32
+
+Scenarios: "chat" (POST /mcp-chat), "workflow-state" (GET /workflow-state on
+threads seeded by a chat run) and "mcp-tool" (server.run_cbt_pipeline over
+HTTP). `--checkpointer postgres` uses POSTGRES_URL instead, e.g. a throwaway
+`docker run --rm -p 5432:5432 -e POSTGRES_PASSWORD=bench postgres:16`;
+`--responses` points FAKE_LLM_RESPONSES at a JSON file of per-agent answers.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+import uuid
+
+from benchmarks.stub_backend import free_port, serve_in_thread
+
+SCENARIOS = ("chat", "workflow-state", "mcp-tool")
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, max(0, int(round(q / 100 * len(sorted_values))) - 1))]
+
+
+async def drive(call, requests: int, concurrency: int) -> dict:
+    """Run `call(i)` `requests` times with at most `concurrency` in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one(i: int):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await call(i)
+            except Exception:
+                errors += 1
+                return
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "rps": round(requests / elapsed, 1)
+    }
+
+
+async def run(scenarios: list, requests: int, concurrency_levels: list, port: int, threads: int) -> list:
+    import httpx
+    import server
+
+    results = []
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=300) as client:
+        async def chat(i: int):
+            response = await client.post("/mcp-chat", json={"user_input": f"help me with exam anxiety #{i}"})
+            response.raise_for_status()
+
+        seeded = []
+        if "workflow-state" in scenarios:
+            for i in range(threads):
+                thread_id = f"bench-{uuid.uuid4()}"
+                response = await client.post("/mcp-chat", json={"user_input": f"sleep worries #{i}", "thread_id": thread_id})
+                response.raise_for_status()
+                seeded.append(thread_id)
+
+        async def workflow_state(i: int):
+            response = await client.get(f"/workflow-state/{seeded[i % len(seeded)]}")
+            response.raise_for_status()
+
+        async def mcp_tool(i: int):
+            await server.run_cbt_pipeline(f"help me with exam anxiety #{i}")
+
+        calls = {"chat": chat, "workflow-state": workflow_state, "mcp-tool": mcp_tool}
+        for scenario in scenarios:
+            await calls[scenario](0)  # warm-up: imports, pools, first compile paths
+            for concurrency in concurrency_levels:
+                results.append({"scenario": scenario, "concurrency": concurrency,
+                                **await drive(calls[scenario], requests, concurrency)})
+    await server.close_http_client()
+    return results
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario and concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--latency", type=float, default=0.05, help="fake LLM latency per call (s)")
+    parser.add_argument("--draft-chars", type=int, default=0, help="pad the fake Draftsman answer to this length")
+    parser.add_argument("--responses", help="JSON file of per-agent fake LLM answers")
+    parser.add_argument("--checkpointer", choices=("memory", "postgres"), default="memory")
+    parser.add_argument("--threads", type=int, default=32, help="threads seeded for workflow-state")
+    parser.add_argument("--json", action="store_true", help="print results as JSON lines")
+    args = parser.parse_args()
+
+    # configure before main/config are imported; nothing below needs network access
+    port = free_port()
+    os.environ.update({
+        "LLM_PROVIDER": "fake",
+        "FAKE_LLM_LATENCY": str(args.latency),
+        "FAKE_LLM_DRAFT_CHARS": str(args.draft_chars),
+        "FAKE_LLM_RESPONSES": args.responses or "",
+        "CHECKPOINTER_BACKEND": args.checkpointer,
+        "CBT_API_URL": f"http://127.0.0.1:{port}",
+        "MCP_PIPELINE_MODE": "http"
+    })
+    os.environ.setdefault("GROQ_API_KEY", "offline-benchmark")
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    import main
+    serve_in_thread(main.api, port)
+    results = asyncio.run(run(args.scenarios, args.requests, args.concurrency, port, args.threads))
+
+    if args.json:
+        for result in results:
+            print(json.dumps(result))
+        return
+    print(f"{'scenario':>15} {'concurrency':>11} {'requests':>8} {'errors':>6} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>8}")
+    for r in results:
+        print(f"{r['scenario']:>15} {r['concurrency']:>11} {r['requests']:>8} {r['errors']:>6} "
+              f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['rps']:>8.1f}")
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
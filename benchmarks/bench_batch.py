@@ -0,0 +1,44 @@
+"""
+Bulk throughput of /mcp-chat/batch at different max_concurrency settings.
+
+Runs `main.run_pipeline_batch` (what the endpoint and the MCP batch tool call)
+with a fake LLM and in-memory checkpointer, so items/s reflects how many graph
+runs overlap while waiting on the model:
+
+    python -m benchmarks.bench_batch --items 64 --latency 0.2 --concurrency 1 4 16 64
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+from contextlib import redirect_stdout
+
+os.environ.setdefault("GROQ_API_KEY", "offline-benchmark")
+os.environ.setdefault("CHECKPOINTER_BACKEND", "memory")
+
+import main
+from fake_llm import FakeChatModel
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--items", type=int, default=64, help="inputs per batch")
+    parser.add_argument("--latency", type=float, default=0.2, help="fake LLM latency per call (s)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    args = parser.parse_args()
+
+    main.llm = FakeChatModel(latency=args.latency)
+    main.BATCH_MAX_CONCURRENCY = max(args.concurrency)
+    items = [main.User(user_input=f"worksheet on exam anxiety, week {i}") for i in range(args.items)]
+
+    print(f"{'concurrency':>11} {'items':>6} {'failed':>6} {'elapsed s':>10} {'items/s':>8}")
+    for concurrency in args.concurrency:
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            batch = asyncio.run(main.run_pipeline_batch(items, concurrency))
+        elapsed = batch["elapsed_ms"] / 1000
+        print(f"{concurrency:>11} {len(items):>6} {batch['failed']:>6} {elapsed:>10.2f} {len(items) / elapsed:>8.1f}")
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
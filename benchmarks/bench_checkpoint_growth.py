@@ -0,0 +1,81 @@
+"""
+Checkpoint write volume per conversation: full snapshots vs per-channel blobs.
+
+Records every `put` of a multi-turn conversation (fake LLM, in-memory
+checkpointer) and sizes it with the configured serde both ways: the whole
+checkpoint per step (previous layout) and the checkpoint without values plus
+only the channels in `new_versions` (checkpoint_blobs layout):
+
+    python -m benchmarks.bench_checkpoint_growth --turns 1 10 50 --draft-chars 3000
+"""
+
+import argparse
+import os
+import sys
+import uuid
+from contextlib import redirect_stdout
+
+os.environ.setdefault("GROQ_API_KEY", "offline-benchmark")
+os.environ.setdefault("CHECKPOINTER_BACKEND", "memory")
+
+from langgraph.checkpoint.memory import MemorySaver
+
+import main
+from checkpoint_serde import create_serde
+from config import CHECKPOINT_COMPRESSION, CHECKPOINT_SERDE
+from fake_llm import FakeChatModel
+
+
+class RecordingSaver(MemorySaver):
+    def __init__(self):
+        super().__init__()
+        self.puts = []
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        self.puts.append((checkpoint, dict(new_versions)))
+        return super().put(config, checkpoint, metadata, new_versions)
+
+
+def conversation(turns: int) -> list:
+    saver = RecordingSaver()
+    app = main.graph.compile(checkpointer=saver)
+    config = {"configurable": {"thread_id": f"bench-{uuid.uuid4()}"}}
+    for i in range(turns):
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            app.invoke({"user_input": f"help me with exam anxiety, part {i}"}, config=config)
+    return saver.puts
+
+
+def volume(serde, puts: list):
+    """Return (full snapshot bytes, incremental bytes, blob rows) for the recorded puts."""
+    size = lambda obj: len(serde.dumps_typed(obj)[1])
+    full = incremental = rows = 0
+    for checkpoint, new_versions in puts:
+        values = checkpoint["channel_values"]
+        full += size(checkpoint)
+        incremental += size({**checkpoint, "channel_values": {}})
+        changed = [channel for channel in new_versions if channel in values]
+        incremental += sum(size(values[channel]) for channel in changed)
+        rows += len(new_versions)
+    return full, incremental, rows
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--draft-chars", type=int, default=3000, help="size of each fake CBT draft")
+    args = parser.parse_args()
+
+    main.llm = FakeChatModel(latency=0, draft_chars=args.draft_chars)
+    serde = create_serde(CHECKPOINT_SERDE if CHECKPOINT_SERDE != "jsonb" else "msgpack", CHECKPOINT_COMPRESSION)
+
+    print(f"{'turns':>5} {'steps':>6} {'full KiB':>9} {'blobs KiB':>10} {'saved':>6} {'blob rows':>10}")
+    for turns in args.turns:
+        puts = conversation(turns)
+        full, incremental, rows = volume(serde, puts)
+        saved = 1 - incremental / full
+        print(f"{turns:>5} {len(puts):>6} {full / 1024:>9.1f} {incremental / 1024:>10.1f} {saved:>6.0%} {rows:>10}")
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
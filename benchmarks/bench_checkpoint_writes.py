@@ -0,0 +1,143 @@
+"""
+Postgres round trips per graph step: per-row put_writes vs batched put_writes.
+
+Counts every statement and commit sent by PostgresCheckpointer while running
+synthetic steps (one `put` plus `--writes` channel writes) and the real graph
+with the fake LLM. Needs a reachable database:
+
+    POSTGRES_URL=postgresql://... python -m benchmarks.bench_checkpoint_writes --writes 6
+"""
+
+import argparse
+import functools
+import os
+import sys
+import time
+import uuid
+from contextlib import redirect_stdout
+
+import psycopg2
+from psycopg2 import extensions
+from psycopg2.extras import Json
+
+os.environ.setdefault("GROQ_API_KEY", "offline-benchmark")
+os.environ.setdefault("CHECKPOINTER_BACKEND", "memory")
+
+from langgraph.checkpoint.base import empty_checkpoint
+
+import main
+from config import POSTGRES_URL
+from fake_llm import FakeChatModel
+from postgres_connector import PostgresCheckpointer
+
+ROUND_TRIPS = {"statements": 0, "commits": 0}
+
+
+class CountingCursor(extensions.cursor):
+    def execute(self, query, vars=None):
+        ROUND_TRIPS["statements"] += 1
+        return super().execute(query, vars)
+
+
+class CountingConnection(extensions.connection):
+    def cursor(self, *args, **kwargs):
+        kwargs.setdefault("cursor_factory", CountingCursor)
+        return super().cursor(*args, **kwargs)
+
+    def commit(self):
+        ROUND_TRIPS["commits"] += 1
+        return super().commit()
+
+
+psycopg2.connect = functools.partial(psycopg2.connect, connection_factory=CountingConnection)
+
+
+class PerRowCheckpointer(PostgresCheckpointer):
+    """The previous put_writes: one INSERT round trip per (channel, value)."""
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        configurable = config.get("configurable", {})
+        with self._get_connection() as conn:
+            with conn.cursor() as cur:
+                for idx, (channel, value) in enumerate(writes):
+                    cur.execute(
+                        """
+                        INSERT INTO checkpoint_writes
+                        (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, value)
+                        VALUES (%s, %s, %s, %s, %s, %s, %s)
+                        """,
+                        (configurable["thread_id"], configurable.get("checkpoint_ns", ""),
+                         configurable["checkpoint_id"], task_id, idx, channel, Json(value))
+                    )
+                self._commit(conn)
+
+
+def reset() -> None:
+    ROUND_TRIPS.update(statements=0, commits=0)
+
+
+def synthetic_steps(saver: PostgresCheckpointer, steps: int, writes: int, transactional: bool):
+    """Run `steps` put + put_writes pairs; return (round trips per step, ms per step)."""
+    config = {"configurable": {"thread_id": f"bench-{uuid.uuid4()}", "checkpoint_ns": ""}}
+    channel_writes = [(f"channel_{i}", {"text": "x" * 200, "i": i}) for i in range(writes)]
+    reset()
+    started = time.perf_counter()
+    for _ in range(steps):
+        checkpoint = empty_checkpoint()
+        if transactional:
+            with saver.transaction():
+                config = saver.put(config, checkpoint, {"source": "loop"}, {})
+                saver.put_writes(config, channel_writes, str(uuid.uuid4()))
+        else:
+            config = saver.put(config, checkpoint, {"source": "loop"}, {})
+            saver.put_writes(config, channel_writes, str(uuid.uuid4()))
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    return (ROUND_TRIPS["statements"] + ROUND_TRIPS["commits"]) / steps, elapsed_ms / steps
+
+
+def graph_steps(saver: PostgresCheckpointer, runs: int):
+    """Run the CBT graph `runs` times; return (round trips per checkpoint, checkpoints per run)."""
+    app = main.graph.compile(checkpointer=saver)
+    trips = puts = 0
+    for i in range(runs):
+        config = {"configurable": {"thread_id": f"bench-{uuid.uuid4()}"}}
+        reset()
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            app.invoke({"user_input": f"help me with exam anxiety #{i}"}, config=config)
+        trips += ROUND_TRIPS["statements"] + ROUND_TRIPS["commits"]
+        puts += len(list(saver.list(config)))
+    return trips / puts, puts / runs
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--steps", type=int, default=200)
+    parser.add_argument("--writes", type=int, default=6, help="channel writes per synthetic step")
+    parser.add_argument("--runs", type=int, default=10, help="graph runs")
+    args = parser.parse_args()
+
+    main.llm = FakeChatModel(latency=0)
+    savers = {"per-row": PerRowCheckpointer(POSTGRES_URL), "batched": PostgresCheckpointer(POSTGRES_URL)}
+
+    print(f"synthetic steps ({args.writes} writes each)")
+    print(f"{'mode':>22} {'round trips/step':>17} {'ms/step':>8}")
+    for name, saver, transactional in (
+        ("per-row", savers["per-row"], False),
+        ("batched", savers["batched"], False),
+        ("batched + transaction", savers["batched"], True)
+    ):
+        trips, ms = synthetic_steps(saver, args.steps, args.writes, transactional)
+        print(f"{name:>22} {trips:>17.1f} {ms:>8.2f}")
+
+    print("\nCBT graph (sync invoke, fake LLM)")
+    print(f"{'mode':>22} {'round trips/step':>17} {'steps/run':>10}")
+    for name, saver in savers.items():
+        trips, steps = graph_steps(saver, args.runs)
+        print(f"{name:>22} {trips:>17.1f} {steps:>10.1f}")
+
+    for saver in savers.values():
+        saver.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,64 @@
+"""
+Throughput of the CBT graph under concurrent requests, against a stubbed LLM.
+
+Compares the old handler behaviour (sync `app.invoke` inside the event loop)
+with `await app.ainvoke`. Runs without Groq or Postgres:
+
+    python -m benchmarks.bench_concurrency --latency 0.2 --requests 32
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+from contextlib import redirect_stdout
+
+os.environ.setdefault("GROQ_API_KEY", "offline-benchmark")
+os.environ.setdefault("CHECKPOINTER_BACKEND", "memory")
+
+import main
+from fake_llm import FakeChatModel
+
+
+def _config():
+    return {"configurable": {"thread_id": f"bench-{uuid.uuid4()}"}}
+
+
+async def run(mode: str, total: int, concurrency: int) -> float:
+    """Run `total` pipelines with at most `concurrency` in flight; return req/s."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with semaphore:
+            payload = {"user_input": f"help me with exam anxiety #{i}"}
+            if mode == "blocking":
+                main.init_runtime().invoke(payload, config=_config())
+            else:
+                await main.init_runtime().ainvoke(payload, config=_config())
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return total / (time.perf_counter() - started)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--latency", type=float, default=0.2, help="fake LLM latency per call (s)")
+    parser.add_argument("--requests", type=int, default=32, help="pipelines per measurement")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    main.llm = FakeChatModel(latency=args.latency)
+
+    print(f"{'concurrency':>11} {'blocking req/s':>15} {'ainvoke req/s':>14}")
+    for concurrency in args.concurrency:
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            blocking = asyncio.run(run("blocking", args.requests, concurrency))
+            non_blocking = asyncio.run(run("async", args.requests, concurrency))
+        print(f"{concurrency:>11} {blocking:>15.2f} {non_blocking:>14.2f}")
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,73 @@
+"""
+MCP tool latency: proxying to the FastAPI backend vs running the graph in-process.
+
+Serves the real main.api (fake LLM, in-memory checkpointer) on a local port and
+calls `server.run_cbt_pipeline` in both MCP_PIPELINE_MODE settings, so the
+difference is the HTTP/SSE hop and its serialization:
+
+    python -m benchmarks.bench_embedded --latency 0.0 --calls 100
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+from contextlib import redirect_stdout
+
+from benchmarks.stub_backend import free_port, serve_in_thread
+
+PORT = free_port()
+os.environ["CBT_API_URL"] = f"http://127.0.0.1:{PORT}"
+os.environ.setdefault("GROQ_API_KEY", "offline-benchmark")
+os.environ.setdefault("CHECKPOINTER_BACKEND", "memory")
+
+import main
+import server
+from fake_llm import FakeChatModel
+
+
+async def run(mode: str, calls: int, concurrency: int):
+    """Issue `calls` tool calls with at most `concurrency` in flight; return (latencies_ms, calls/s)."""
+    server.MCP_PIPELINE_MODE = mode
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i: int):
+        async with semaphore:
+            started = time.perf_counter()
+            await server.run_cbt_pipeline(f"help me with exam anxiety #{i}")
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(calls)))
+    elapsed = time.perf_counter() - started
+    await server.close_http_client()
+    return latencies, calls / elapsed
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--latency", type=float, default=0.0, help="fake LLM latency per call (s)")
+    parser.add_argument("--calls", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    args = parser.parse_args()
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    main.llm = FakeChatModel(latency=args.latency, stream_chunks=8)
+    serve_in_thread(main.api, PORT)
+
+    print(f"{'concurrency':>11} {'mode':>9} {'p50 ms':>8} {'p95 ms':>8} {'calls/s':>8}")
+    for concurrency in args.concurrency:
+        for mode in ("http", "embedded"):
+            with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+                latencies, throughput = asyncio.run(run(mode, args.calls, concurrency))
+            p50 = statistics.median(latencies)
+            p95 = statistics.quantiles(latencies, n=20)[-1]
+            print(f"{concurrency:>11} {mode:>9} {p50:>8.1f} {p95:>8.1f} {throughput:>8.1f}")
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,69 @@
+"""
+MCP tool throughput: per-call blocking requests.post vs the shared async client.
+
+Drives `server.run_cbt_pipeline` against a local stub backend, so it measures
+the MCP-to-backend hop rather than the pipeline itself:
+
+    python -m benchmarks.bench_mcp_client --latency 0.05 --calls 200
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import time
+
+import requests
+
+from benchmarks.stub_backend import create_stub_api, free_port, serve_in_thread
+
+PORT = free_port()
+os.environ["CBT_API_URL"] = f"http://127.0.0.1:{PORT}"
+
+import server
+
+
+def blocking_tool(user_input: str) -> str:
+    """The previous tool body: a new connection per call, blocking the event loop."""
+    result = requests.post(url=f"{server.CBT_API_URL}/mcp-chat", json={"user_input": user_input})
+    return result.json().get("response")
+
+
+async def run(mode: str, calls: int, concurrency: int) -> float:
+    """Issue `calls` tool calls with at most `concurrency` in flight; return calls/s."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with semaphore:
+            if mode == "before":
+                blocking_tool(f"exam anxiety #{i}")
+            else:
+                await server.run_cbt_pipeline(f"exam anxiety #{i}")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(calls)))
+    elapsed = time.perf_counter() - started
+    if mode == "after":
+        await server.close_http_client()
+    return calls / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--latency", type=float, default=0.05, help="stub backend latency per call (s)")
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    args = parser.parse_args()
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    serve_in_thread(create_stub_api(args.latency), PORT)
+
+    print(f"{'concurrency':>11} {'before calls/s':>15} {'after calls/s':>14}")
+    for concurrency in args.concurrency:
+        before = asyncio.run(run("before", args.calls, concurrency))
+        after = asyncio.run(run("after", args.calls, concurrency))
+        print(f"{concurrency:>11} {before:>15.1f} {after:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Checkpoint encodings: bytes per checkpoint and encode/decode time.
+
+Captures the checkpoints and writes of real CBT graph runs (fake LLM,
+in-memory checkpointer) and re-encodes them as the previous JSONB text and
+with each CHECKPOINT_SERDE / CHECKPOINT_COMPRESSION combination:
+
+    python -m benchmarks.bench_serde --runs 20
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+from contextlib import redirect_stdout
+
+os.environ.setdefault("GROQ_API_KEY", "offline-benchmark")
+os.environ.setdefault("CHECKPOINTER_BACKEND", "memory")
+
+from langgraph.checkpoint.memory import MemorySaver
+
+import main
+from checkpoint_serde import create_serde
+from fake_llm import FakeChatModel
+
+
+class JsonText:
+    """What Json()/Jsonb() sent before: the checkpoint as JSON text."""
+
+    def dumps_typed(self, obj):
+        return "json", json.dumps(obj).encode("utf-8")
+
+    def loads_typed(self, data):
+        return json.loads(data[1])
+
+
+def capture(runs: int):
+    """Checkpoints and write values produced by `runs` graph runs."""
+    saver = MemorySaver()
+    app = main.graph.compile(checkpointer=saver)
+    checkpoints, values = [], []
+    for i in range(runs):
+        config = {"configurable": {"thread_id": f"bench-{uuid.uuid4()}"}}
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            app.invoke({"user_input": f"help me with exam anxiety before my finals #{i}"}, config=config)
+        for item in saver.list(config):
+            checkpoints.append(item.checkpoint)
+            values.extend(value for _, _, value in item.pending_writes or [])
+    return checkpoints, values
+
+
+def measure(serde, objects: list, repeat: int):
+    """Return (mean bytes, encode µs, decode µs) per object."""
+    encoded = [serde.dumps_typed(obj) for obj in objects]
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for obj in objects:
+            serde.dumps_typed(obj)
+    encode_us = (time.perf_counter() - started) / (repeat * len(objects)) * 1e6
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for data in encoded:
+            serde.loads_typed(data)
+    decode_us = (time.perf_counter() - started) / (repeat * len(objects)) * 1e6
+    return statistics.mean(len(payload) for _, payload in encoded), encode_us, decode_us
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=20, help="graph runs to capture")
+    parser.add_argument("--repeat", type=int, default=20, help="timing passes over the captured objects")
+    parser.add_argument("--latency", type=float, default=0.0, help="fake LLM latency per call (s)")
+    args = parser.parse_args()
+
+    main.llm = FakeChatModel(latency=args.latency)
+    checkpoints, values = capture(args.runs)
+
+    encodings = {"jsonb (previous)": JsonText()}
+    for format in ("msgpack", "pickle"):
+        encodings[format] = create_serde(format)
+        try:
+            encodings[f"{format}+zstd"] = create_serde(format, "zstd")
+        except ImportError:
+            pass
+
+    for label, objects in (("checkpoints", checkpoints), ("write values", values)):
+        print(f"{label} ({len(objects)} captured)")
+        print(f"{'encoding':>18} {'bytes':>8} {'encode µs':>10} {'decode µs':>10}")
+        for name, serde in encodings.items():
+            size, encode_us, decode_us = measure(serde, objects, args.repeat)
+            print(f"{name:>18} {size:>8.0f} {encode_us:>10.1f} {decode_us:>10.1f}")
+        print()
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,79 @@
+"""
+Cold-start cost: importing main, building the runtime and serving the first run.
+
+Each stage runs in fresh interpreters (`--runs` times, median and min
+reported), so module caches and pools never carry over. The LLM is the fake
+model and the checkpointer in-memory unless `--checkpointer postgres`, which
+adds the pool connect and schema DDL of init_runtime():
+
+    python -m benchmarks.bench_startup --runs 5 --top 10
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+STAGES = {
+    "import main": "import main",
+    "import + init_runtime": "import main; main.init_runtime()",
+    "import + first run": (
+        "import main; main.init_runtime().invoke("
+        "{'user_input': 'exam anxiety'}, main.thread_config('startup'))"
+    ),
+    "import server (MCP)": "import server"
+}
+
+
+def measure(code: str, env: dict) -> float:
+    """Wall ms of `code` in a new interpreter, timed from inside it (interpreter boot excluded)."""
+    timed = f"import time; _t = time.perf_counter(); {code}; print((time.perf_counter() - _t) * 1000)"
+    out = subprocess.run([sys.executable, "-c", timed], env=env, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(env: dict, top: int) -> list:
+    """(cumulative ms, module) of main's direct imports, from `python -X importtime`."""
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],
+                         env=env, capture_output=True, text=True, check=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # direct children of `main` are indented by exactly two spaces
+        if name.startswith("   ") and not name.startswith("    ") and cumulative.strip().isdigit():
+            rows.append((int(cumulative) / 1000, name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--checkpointer", choices=("memory", "postgres"), default="memory")
+    parser.add_argument("--top", type=int, default=0, help="also list the N slowest imports of main")
+    args = parser.parse_args()
+
+    env = {
+        **os.environ,
+        "LLM_PROVIDER": "fake",
+        "FAKE_LLM_LATENCY": "0",
+        "CHECKPOINTER_BACKEND": args.checkpointer,
+        "PYTHONWARNINGS": "ignore"
+    }
+    env.setdefault("GROQ_API_KEY", "offline-benchmark")
+
+    print(f"{'stage':>24} {'median ms':>10} {'min ms':>8}")
+    for stage, code in STAGES.items():
+        samples = [measure(code, env) for _ in range(args.runs)]
+        print(f"{stage:>24} {statistics.median(samples):>10.1f} {min(samples):>8.1f}")
+
+    if args.top:
+        print(f"\n{'cumulative ms':>14}  import (direct from main)")
+        for ms, name in slowest_imports(env, args.top):
+            print(f"{ms:>14.1f}  {name}")
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,55 @@
+"""Minimal stand-in for main.py's API: fixed latency, canned responses, no LLM or DB."""
+
+import asyncio
+import json
+import socket
+import threading
+import time
+
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+
+class User(BaseModel):
+    user_input: str
+    thread_id: str | None = None
+
+
+def create_stub_api(latency: float) -> FastAPI:
+    api = FastAPI()
+
+    @api.post("/mcp-chat")
+    async def chat(question: User):
+        await asyncio.sleep(latency)
+        return {"response": f"CBT exercise for {question.user_input}", "thread_id": "stub"}
+
+    @api.post("/mcp-chat/stream")
+    async def chat_stream(question: User):
+        async def events():
+            for stage in ("router", "safety", "draft", "critic", "finalize"):
+                await asyncio.sleep(latency / 5)
+                data = {"stage": stage, "status": "completed", "elapsed_ms": 0}
+                yield f"event: stage\ndata: {json.dumps(data)}\n\n"
+            final = {"response": f"CBT exercise for {question.user_input}", "thread_id": "stub", "timings": {}}
+            yield f"event: final\ndata: {json.dumps(final)}\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return api
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def serve_in_thread(app, port: int) -> uvicorn.Server:
+    """Start uvicorn on 127.0.0.1:`port` in a daemon thread and wait until it accepts requests."""
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
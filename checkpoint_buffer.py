@@ -0,0 +1,365 @@
+import asyncio
+import atexit
+import copy
+import logging
+import threading
+import time
+from collections import Counter, deque
+from contextlib import nullcontext
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Sequence
+
+import psycopg2
+from langgraph.checkpoint.base import BaseCheckpointSaver, Checkpoint, CheckpointTuple
+from langgraph.checkpoint.base.id import uuid6
+
+from postgres_connector import CheckpointChannels, _checkpoint_config, aread_channels, read_channels
+
+
+logger = logging.getLogger(__name__)
+
+DURABILITY_MODES = ("sync", "exit", "interval")
+
+# Failures that may clear up on their own (database down, pool exhausted,
+# lock/serialization conflicts); batches failing with these are retried forever
+TRANSIENT_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError, ConnectionError, TimeoutError)
+
+
+class WriteBehindCheckpointer(BaseCheckpointSaver):
+    """
+    Buffers `put`/`put_writes` in memory and writes them to another saver
+    from a background thread, so graph steps do not wait for DB commits.
+
+    Durability modes:
+        sync: no buffering, every call goes straight to the wrapped saver
+        exit: buffer for the whole run; `end_run()` schedules the flush
+        interval: flush every `interval` seconds or once `batch_size` ops queue up
+
+    At most `max_pending` operations are buffered; past that, writers block
+    until the flusher catches up. Each batch is written in one transaction
+    when the wrapped saver supports `transaction()`, and a failed batch stays
+    queued for the next attempt. A batch that keeps failing with an error
+    outside TRANSIENT_ERRORS (e.g. a value that cannot be serialized) is
+    written one operation at a time after `max_retries` attempts, and the
+    operations that still fail are logged and dropped. Reads of a thread
+    with buffered operations flush first, and `close()`/`aclose()` (also run
+    at interpreter exit) flush whatever is left.
+    """
+
+    def __init__(
+        self,
+        saver: BaseCheckpointSaver,
+        mode: str = "interval",
+        interval: float = 1.0,
+        max_pending: int = 1000,
+        batch_size: int = 100,
+        max_retries: int = 3
+    ):
+        """
+        Args:
+            saver: Checkpointer that receives the buffered operations
+            mode: One of "sync", "exit" or "interval"
+            interval: Seconds between background flushes in "interval" mode
+            max_pending: Buffered operations before writers block
+            batch_size: Operations written per transaction
+            max_retries: Retries of a batch failing with a non-transient
+                error before its failing operations are dropped
+        """
+        if mode not in DURABILITY_MODES:
+            raise ValueError(f"mode must be one of {DURABILITY_MODES}, got {mode!r}")
+        super().__init__(serde=saver.serde)
+        self.saver = saver
+        self.mode = mode
+        self.interval = interval
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._ops = deque()                  # ("put" | "writes", thread_id, args)
+        self._pending_threads = Counter()    # buffered operations per thread
+        self._flush_requested = False
+        self._closed = False
+        self._failed_attempts = 0            # non-transient failures of the head batch
+        self._stats = {
+            "flushed_ops": 0,
+            "batches": 0,
+            "flush_errors": 0,
+            "dropped_ops": 0,
+            "backpressure_waits": 0,
+            "max_depth": 0,
+            "last_flush_ms": 0.0
+        }
+
+        self._thread = None
+        if mode != "sync":
+            self._thread = threading.Thread(target=self._run, name="checkpoint-write-behind", daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if self.mode == "interval":
+                    self._cond.wait_for(
+                        lambda: self._closed or self._flush_requested or len(self._ops) >= self.batch_size,
+                        timeout=self.interval
+                    )
+                else:
+                    self._cond.wait_for(lambda: self._closed or self._flush_requested)
+                if self._closed:
+                    return
+                self._flush_requested = False
+            try:
+                self.flush()
+            except Exception:
+                # Batch stays queued; retry after a pause
+                time.sleep(min(self.interval, 1.0))
+                with self._cond:
+                    self._flush_requested = True
+
+    def _enqueue(self, kind: str, thread_id: str, args: tuple) -> None:
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("write-behind checkpointer is closed")
+            if len(self._ops) >= self.max_pending:
+                self._stats["backpressure_waits"] += 1
+                self._flush_requested = True
+                self._cond.notify_all()
+                self._cond.wait_for(lambda: len(self._ops) < self.max_pending or self._closed)
+            self._ops.append((kind, thread_id, args))
+            self._pending_threads[thread_id] += 1
+            self._stats["max_depth"] = max(self._stats["max_depth"], len(self._ops))
+            if len(self._ops) >= self.batch_size:
+                self._cond.notify_all()
+
+    async def _aenqueue(self, kind: str, thread_id: str, args: tuple) -> None:
+        with self._cond:
+            full = len(self._ops) >= self.max_pending
+        if full:
+            await asyncio.to_thread(self._enqueue, kind, thread_id, args)
+        else:
+            self._enqueue(kind, thread_id, args)
+
+    def _apply(self, batch: list) -> None:
+        transaction = getattr(self.saver, "transaction", None)
+        with transaction() if transaction is not None else nullcontext():
+            for kind, _, args in batch:
+                if kind == "put":
+                    self.saver.put(*args)
+                else:
+                    self.saver.put_writes(*args)
+
+    def _apply_each(self, batch: list) -> None:
+        """Write `batch` one operation at a time, logging and dropping those that fail."""
+        for op in batch:
+            try:
+                self._apply([op])
+            except TRANSIENT_ERRORS:
+                raise
+            except Exception:
+                kind, thread_id, _ = op
+                logger.exception("Dropping buffered checkpoint %s of thread %s", kind, thread_id)
+                with self._cond:
+                    self._stats["dropped_ops"] += 1
+
+    def flush(self) -> None:
+        """Write every buffered operation to the wrapped saver, blocking until done."""
+        with self._flush_lock:
+            while True:
+                with self._cond:
+                    if not self._ops:
+                        return
+                    batch = [self._ops[i] for i in range(min(self.batch_size, len(self._ops)))]
+                started = time.perf_counter()
+                try:
+                    if self._failed_attempts > self.max_retries:
+                        self._apply_each(batch)
+                    else:
+                        self._apply(batch)
+                except Exception as ex:
+                    with self._cond:
+                        self._stats["flush_errors"] += 1
+                    if not isinstance(ex, TRANSIENT_ERRORS):
+                        self._failed_attempts += 1
+                    raise
+                self._failed_attempts = 0
+                with self._cond:
+                    for _ in batch:
+                        _, thread_id, _ = self._ops.popleft()
+                        self._pending_threads[thread_id] -= 1
+                        if not self._pending_threads[thread_id]:
+                            del self._pending_threads[thread_id]
+                    self._stats["flushed_ops"] += len(batch)
+                    self._stats["batches"] += 1
+                    self._stats["last_flush_ms"] = round((time.perf_counter() - started) * 1000, 2)
+                    self._cond.notify_all()
+
+    async def aflush(self) -> None:
+        """Async version of `flush` (runs in a worker thread)."""
+        await asyncio.to_thread(self.flush)
+
+    def end_run(self) -> None:
+        """Mark the end of a graph run; in "exit" mode this schedules a background flush."""
+        if self.mode == "exit":
+            with self._cond:
+                self._flush_requested = True
+                self._cond.notify_all()
+
+    def _has_pending(self, config: Optional[Dict[str, Any]]) -> bool:
+        with self._cond:
+            thread_id = (config or {}).get("configurable", {}).get("thread_id")
+            if not thread_id:
+                return bool(self._ops)
+            return thread_id in self._pending_threads
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "mode": self.mode,
+                "pending": len(self._ops),
+                "max_pending": self.max_pending,
+                "batch_size": self.batch_size,
+                "interval": self.interval,
+                **self._stats
+            }
+
+    def pool_stats(self) -> Optional[Dict[str, Any]]:
+        pool_stats = getattr(self.saver, "pool_stats", None)
+        return pool_stats() if pool_stats is not None else None
+
+    def _stop(self) -> None:
+        if self._thread is None:
+            return
+        atexit.unregister(self.close)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        self._thread = None
+        self.flush()
+
+    def close(self) -> None:
+        """Flush the buffer, stop the flusher and close the wrapped saver."""
+        self._stop()
+        close = getattr(self.saver, "close", None)
+        if close is not None:
+            close()
+
+    async def aclose(self) -> None:
+        """Async version of `close`."""
+        await asyncio.to_thread(self._stop)
+        aclose = getattr(self.saver, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+    def get_next_version(self, current: Optional[Any], channel: None) -> Any:
+        return self.saver.get_next_version(current, channel)
+
+    def get_tuple(self, config: Dict[str, Any]) -> Optional[CheckpointTuple]:
+        if self._has_pending(config):
+            self.flush()
+        return self.saver.get_tuple(config)
+
+    async def aget_tuple(self, config: Dict[str, Any]) -> Optional[CheckpointTuple]:
+        if self._has_pending(config):
+            await self.aflush()
+        return await self.saver.aget_tuple(config)
+
+    def get_channels(self, config: Dict[str, Any], channels: Sequence[str]) -> Optional[CheckpointChannels]:
+        if self._has_pending(config):
+            self.flush()
+        return read_channels(self.saver, config, channels)
+
+    async def aget_channels(self, config: Dict[str, Any], channels: Sequence[str]) -> Optional[CheckpointChannels]:
+        if self._has_pending(config):
+            await self.aflush()
+        return await aread_channels(self.saver, config, channels)
+
+    def list(
+        self,
+        config: Optional[Dict[str, Any]] = None,
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[Dict[str, Any]] = None,
+        limit: Optional[int] = None
+    ) -> Iterator[CheckpointTuple]:
+        if self._has_pending(config):
+            self.flush()
+        yield from self.saver.list(config, filter=filter, before=before, limit=limit)
+
+    async def alist(
+        self,
+        config: Optional[Dict[str, Any]] = None,
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[Dict[str, Any]] = None,
+        limit: Optional[int] = None
+    ) -> AsyncIterator[CheckpointTuple]:
+        if self._has_pending(config):
+            await self.aflush()
+        async for item in self.saver.alist(config, filter=filter, before=before, limit=limit):
+            yield item
+
+    def _prepare_put(self, config: Dict[str, Any], checkpoint: Checkpoint, metadata: Dict[str, Any], new_versions: Dict[str, Any]):
+        thread_id = config.get("configurable", {}).get("thread_id")
+        checkpoint_ns = config.get("configurable", {}).get("checkpoint_ns", "")
+        if not thread_id:
+            raise ValueError("thread_id required in config")
+        # Snapshot now: state objects may be mutated before the flush runs
+        checkpoint = copy.deepcopy(checkpoint)
+        checkpoint.setdefault("id", str(uuid6()))
+        args = (config, checkpoint, copy.deepcopy(metadata), new_versions)
+        return thread_id, args, _checkpoint_config(thread_id, checkpoint_ns, checkpoint["id"])
+
+    def put(
+        self,
+        config: Dict[str, Any],
+        checkpoint: Checkpoint,
+        metadata: Dict[str, Any],
+        new_versions: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        if self.mode == "sync":
+            return self.saver.put(config, checkpoint, metadata, new_versions)
+        thread_id, args, next_config = self._prepare_put(config, checkpoint, metadata, new_versions)
+        self._enqueue("put", thread_id, args)
+        return next_config
+
+    async def aput(
+        self,
+        config: Dict[str, Any],
+        checkpoint: Checkpoint,
+        metadata: Dict[str, Any],
+        new_versions: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        if self.mode == "sync":
+            return await self.saver.aput(config, checkpoint, metadata, new_versions)
+        thread_id, args, next_config = self._prepare_put(config, checkpoint, metadata, new_versions)
+        await self._aenqueue("put", thread_id, args)
+        return next_config
+
+    def put_writes(
+        self,
+        config: Dict[str, Any],
+        writes: Sequence[tuple],
+        task_id: str,
+        task_path: str = ""
+    ) -> None:
+        if self.mode == "sync":
+            return self.saver.put_writes(config, writes, task_id, task_path)
+        thread_id = config.get("configurable", {}).get("thread_id")
+        if thread_id:
+            self._enqueue("writes", thread_id, (config, copy.deepcopy(list(writes)), task_id, task_path))
+
+    async def aput_writes(
+        self,
+        config: Dict[str, Any],
+        writes: Sequence[tuple],
+        task_id: str,
+        task_path: str = ""
+    ) -> None:
+        if self.mode == "sync":
+            return await self.saver.aput_writes(config, writes, task_id, task_path)
+        thread_id = config.get("configurable", {}).get("thread_id")
+        if thread_id:
+            await self._aenqueue("writes", thread_id, (config, copy.deepcopy(list(writes)), task_id, task_path))
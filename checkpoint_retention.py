@@ -0,0 +1,556 @@
+import argparse
+import json
+import logging
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from langgraph.checkpoint.base.id import UUID
+
+from postgres_connector import CREATE_TABLES_SQL, PostgresCheckpointer
+
+logger = logging.getLogger(__name__)
+
+# 100-ns intervals between the UUID epoch (1582-10-15) and the Unix epoch
+UUID_EPOCH_OFFSET = 0x01B21DD213814000
+
+# Tables partitioned together, so one time range drops from both at once
+PARTITIONED_TABLES = {
+    "checkpoints": "thread_id, checkpoint_ns, checkpoint_id",
+    "checkpoint_writes": "thread_id, checkpoint_ns, checkpoint_id, task_id, idx",
+}
+
+
+def checkpoint_id_at(ts: float) -> str:
+    """Smallest uuid6 checkpoint id for Unix time `ts`; ids sort by creation time."""
+    timestamp = int(ts * 10_000_000) + UUID_EPOCH_OFFSET
+    value = ((timestamp >> 12) & 0xFFFFFFFFFFFF) << 80 | (timestamp & 0x0FFF) << 64
+    return str(UUID(int=value, version=6))
+
+
+def checkpoint_id_time(checkpoint_id: str) -> float:
+    """Unix time encoded in a uuid6 checkpoint id."""
+    return (UUID(checkpoint_id).time - UUID_EPOCH_OFFSET) / 10_000_000
+
+
+THREAD_CUTOFFS_SQL = """
+    SELECT t.thread_id, t.checkpoint_ns, cutoff.checkpoint_id
+    FROM (
+        SELECT DISTINCT thread_id, checkpoint_ns
+        FROM checkpoints
+        WHERE (thread_id, checkpoint_ns) > (%s, %s)
+        ORDER BY thread_id, checkpoint_ns
+        LIMIT %s
+    ) t
+    LEFT JOIN LATERAL (
+        SELECT checkpoint_id
+        FROM checkpoints c
+        WHERE c.thread_id = t.thread_id AND c.checkpoint_ns = t.checkpoint_ns
+        ORDER BY checkpoint_id DESC
+        OFFSET %s
+        LIMIT 1
+    ) cutoff ON TRUE
+    ORDER BY t.thread_id, t.checkpoint_ns
+"""
+
+DELETE_CHECKPOINTS_SQL = """
+    DELETE FROM checkpoints
+    WHERE (thread_id, checkpoint_ns, checkpoint_id) IN (
+        SELECT thread_id, checkpoint_ns, checkpoint_id
+        FROM checkpoints
+        WHERE {where}
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING thread_id, checkpoint_ns, checkpoint_id
+"""
+
+DELETE_WRITES_OF_SQL = """
+    DELETE FROM checkpoint_writes w
+    USING unnest(%s::text[], %s::text[], %s::text[]) AS d(thread_id, checkpoint_ns, checkpoint_id)
+    WHERE w.thread_id = d.thread_id
+    AND w.checkpoint_ns = d.checkpoint_ns
+    AND w.checkpoint_id = d.checkpoint_id
+"""
+
+DELETE_ORPHAN_WRITES_SQL = """
+    DELETE FROM checkpoint_writes
+    WHERE (thread_id, checkpoint_ns, checkpoint_id, task_id, idx) IN (
+        SELECT w.thread_id, w.checkpoint_ns, w.checkpoint_id, w.task_id, w.idx
+        FROM checkpoint_writes w
+        WHERE NOT EXISTS (
+            SELECT 1 FROM checkpoints c
+            WHERE c.thread_id = w.thread_id
+            AND c.checkpoint_ns = w.checkpoint_ns
+            AND c.checkpoint_id = w.checkpoint_id
+        )
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+    )
+"""
+
+DELETE_ORPHAN_THREAD_BLOBS_SQL = """
+    DELETE FROM checkpoint_blobs
+    WHERE (thread_id, checkpoint_ns, channel, version) IN (
+        SELECT b.thread_id, b.checkpoint_ns, b.channel, b.version
+        FROM checkpoint_blobs b
+        WHERE NOT EXISTS (
+            SELECT 1 FROM checkpoints c
+            WHERE c.thread_id = b.thread_id AND c.checkpoint_ns = b.checkpoint_ns
+        )
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+    )
+"""
+
+SELECT_THREAD_CHECKPOINTS_SQL = """
+    SELECT checkpoint_id, type, checkpoint_blob, checkpoint
+    FROM checkpoints
+    WHERE thread_id = %s AND checkpoint_ns = %s
+"""
+
+DELETE_UNREFERENCED_BLOBS_SQL = """
+    DELETE FROM checkpoint_blobs b
+    WHERE b.thread_id = %s AND b.checkpoint_ns = %s
+    AND NOT EXISTS (
+        SELECT 1 FROM unnest(%s::text[], %s::text[]) AS v(channel, version)
+        WHERE v.channel = b.channel AND v.version = b.version
+    )
+"""
+
+SELECT_PARTITIONS_SQL = """
+    SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = to_regclass(%s)
+"""
+
+SELECT_PARTITION_THREADS_SQL = """
+    SELECT DISTINCT thread_id, checkpoint_ns FROM {partition}
+"""
+
+SELECT_SECONDARY_INDEXES_SQL = """
+    SELECT i.relname
+    FROM pg_index x
+    JOIN pg_class i ON i.oid = x.indexrelid
+    WHERE x.indrelid = to_regclass(%s) AND NOT x.indisprimary
+"""
+
+
+class CheckpointRetention:
+    """
+    Retention and partition maintenance for the PostgresCheckpointer tables.
+
+    Each pass deletes at most `batch_size` rows per transaction and at most
+    `max_batches` transactions per rule. Row selection uses
+    `FOR UPDATE SKIP LOCKED` and every transaction runs with a short
+    `lock_timeout`, so maintenance skips or gives up on rows and tables that
+    live requests are using instead of queueing behind them.
+    """
+
+    def __init__(
+        self,
+        checkpointer: PostgresCheckpointer,
+        *,
+        keep_last: int = 0,
+        max_age_days: float = 0,
+        batch_size: int = 500,
+        max_batches: int = 100,
+        partition_days: int = 0,
+        partitions_ahead: int = 2,
+        blob_grace: float = 600.0,
+        lock_timeout_ms: int = 2000
+    ):
+        """
+        Args:
+            checkpointer: Checkpointer whose pool and serde are used
+            keep_last: Checkpoints kept per thread (0 keeps all)
+            max_age_days: Delete checkpoints older than this (0 keeps all)
+            batch_size: Rows deleted per transaction
+            max_batches: Transactions per rule and pass
+            partition_days: Width of each range partition in days (0 leaves
+                the tables unpartitioned)
+            partitions_ahead: Future partitions kept created
+            blob_grace: Channel blobs of threads active within this many
+                seconds are left for a later pass, as an in-flight `put`
+                may have written blobs for a checkpoint not yet committed
+            lock_timeout_ms: Per-transaction lock wait before giving up
+        """
+        self.checkpointer = checkpointer
+        self.keep_last = keep_last
+        self.max_age_days = max_age_days
+        self.batch_size = batch_size
+        self.max_batches = max_batches
+        self.partition_days = partition_days
+        self.partitions_ahead = partitions_ahead
+        self.blob_grace = blob_grace
+        self.lock_timeout_ms = lock_timeout_ms
+
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stats = {
+            "runs": 0,
+            "errors": 0,
+            "last_error": None,
+            "last_run_ms": 0.0,
+            "checkpoints_deleted": 0,
+            "writes_deleted": 0,
+            "blobs_deleted": 0,
+            "partitions_created": 0,
+            "partitions_dropped": 0
+        }
+        # threads whose blob sweep was deferred because they were still active
+        self._pending_sweeps: set = set()
+
+    @contextmanager
+    def _transaction(self):
+        with self.checkpointer.pool.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SET LOCAL lock_timeout = %s", (f"{self.lock_timeout_ms}ms",))
+                yield cur
+            conn.commit()
+
+    def _count(self, **counts: int) -> None:
+        with self._lock:
+            for name, value in counts.items():
+                self._stats[name] += value
+
+    # Row-level retention
+
+    def _delete_checkpoints(self, where: str, params: tuple) -> List[Tuple[str, str, str]]:
+        """Delete one batch of matching checkpoints and their writes; return the deleted keys."""
+        with self._transaction() as cur:
+            cur.execute(DELETE_CHECKPOINTS_SQL.format(where=where), (*params, self.batch_size))
+            deleted = cur.fetchall()
+            if deleted:
+                cur.execute(DELETE_WRITES_OF_SQL, tuple(map(list, zip(*deleted))))
+                self._count(checkpoints_deleted=len(deleted), writes_deleted=cur.rowcount)
+        return deleted
+
+    def prune_keep_last(self) -> set:
+        """Keep the newest `keep_last` checkpoints of every thread; return the threads touched."""
+        touched = set()
+        if self.keep_last <= 0:
+            return touched
+        after = ("", "")
+        batches = 0
+        while batches < self.max_batches:
+            with self._transaction() as cur:
+                cur.execute(THREAD_CUTOFFS_SQL, (*after, self.batch_size, self.keep_last))
+                threads = cur.fetchall()
+            if not threads:
+                break
+            after = threads[-1][:2]
+            for thread_id, checkpoint_ns, cutoff in threads:
+                while cutoff is not None and batches < self.max_batches:
+                    batches += 1
+                    deleted = self._delete_checkpoints(
+                        "thread_id = %s AND checkpoint_ns = %s AND checkpoint_id <= %s",
+                        (thread_id, checkpoint_ns, cutoff)
+                    )
+                    if deleted:
+                        touched.add((thread_id, checkpoint_ns))
+                    if len(deleted) < self.batch_size:
+                        break
+        return touched
+
+    def prune_max_age(self) -> set:
+        """Delete checkpoints older than `max_age_days`; return the threads touched."""
+        touched = set()
+        if self.max_age_days <= 0:
+            return touched
+        cutoff = checkpoint_id_at(time.time() - self.max_age_days * 86400)
+        for _ in range(self.max_batches):
+            deleted = self._delete_checkpoints("checkpoint_id < %s", (cutoff,))
+            touched.update((thread_id, checkpoint_ns) for thread_id, checkpoint_ns, _ in deleted)
+            if len(deleted) < self.batch_size:
+                break
+        return touched
+
+    def prune_orphans(self, touched: set = frozenset()) -> None:
+        """
+        Delete writes whose checkpoint is gone, blobs of threads with no
+        checkpoints left, and blob versions no remaining checkpoint of a
+        `touched` thread refers to. Threads still active within
+        `blob_grace` are remembered and swept on a later pass.
+        """
+        for _ in range(self.max_batches):
+            with self._transaction() as cur:
+                cur.execute(DELETE_ORPHAN_WRITES_SQL, (self.batch_size,))
+                deleted = cur.rowcount
+            self._count(writes_deleted=deleted)
+            if deleted < self.batch_size:
+                break
+
+        for _ in range(self.max_batches):
+            with self._transaction() as cur:
+                cur.execute(DELETE_ORPHAN_THREAD_BLOBS_SQL, (self.batch_size,))
+                deleted = cur.rowcount
+            self._count(blobs_deleted=deleted)
+            if deleted < self.batch_size:
+                break
+
+        with self._lock:
+            self._pending_sweeps.update(touched)
+            pending = list(self._pending_sweeps)
+        idle_before = checkpoint_id_at(time.time() - self.blob_grace)
+        for thread in pending:
+            with self._transaction() as cur:
+                cur.execute(SELECT_THREAD_CHECKPOINTS_SQL, thread)
+                rows = cur.fetchall()
+                if rows and max(row[0] for row in rows) >= idle_before:
+                    continue  # still active: stays pending
+                if rows:
+                    referenced = set()
+                    for _, type_, payload, checkpoint_json in rows:
+                        checkpoint = self.checkpointer._load(type_, payload, checkpoint_json)
+                        referenced.update(
+                            (channel, str(version))
+                            for channel, version in (checkpoint.get("channel_versions") or {}).items()
+                        )
+                    channels, versions = (list(column) for column in zip(*referenced)) if referenced else ([], [])
+                    cur.execute(DELETE_UNREFERENCED_BLOBS_SQL, (*thread, channels, versions))
+                    self._count(blobs_deleted=cur.rowcount)
+                # no rows: the thread is gone and its blobs were swept above
+            with self._lock:
+                self._pending_sweeps.discard(thread)
+
+    # Partitioning
+
+    def _period(self) -> float:
+        return self.partition_days * 86400
+
+    def _partitions(self, cur, table: str) -> Dict[str, Optional[str]]:
+        """Partition name -> upper bound checkpoint id (None for the default partition)."""
+        cur.execute(SELECT_PARTITIONS_SQL, (table,))
+        partitions = {}
+        for name, bound in cur.fetchall():
+            upper = re.search(r"TO \('([^']+)'\)", bound or "")
+            partitions[name] = upper.group(1) if upper else None
+        return partitions
+
+    def _convert(self, cur, table: str, primary_key: str, upper: str) -> None:
+        """Turn an existing plain table into a range-partitioned one, keeping its rows as `<table>_legacy`."""
+        cur.execute(SELECT_SECONDARY_INDEXES_SQL, (table,))
+        for (index,) in cur.fetchall():
+            cur.execute(f"ALTER INDEX {index} RENAME TO {index}_legacy")
+        # recreated on the parent (and cloned onto every partition) by CREATE_TABLES_SQL
+        cur.execute(f"DROP TRIGGER IF EXISTS checkpoints_notify ON {table}")
+        cur.execute(f"ALTER TABLE {table} RENAME TO {table}_legacy")
+        cur.execute(f"ALTER INDEX IF EXISTS {table}_pkey RENAME TO {table}_legacy_pkey")
+        cur.execute(
+            f"CREATE TABLE {table} (LIKE {table}_legacy INCLUDING DEFAULTS) "
+            f"PARTITION BY RANGE (checkpoint_id)"
+        )
+        cur.execute(f"ALTER TABLE {table} ADD PRIMARY KEY ({primary_key})")
+        cur.execute(
+            f"ALTER TABLE {table} ATTACH PARTITION {table}_legacy FOR VALUES FROM (MINVALUE) TO (%s)",
+            (upper,)
+        )
+        cur.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+
+    def partition(self, convert: bool = False) -> List[str]:
+        """
+        Range-partition both tables by checkpoint id (i.e. creation time) in
+        `partition_days` slices and keep `partitions_ahead` future slices
+        created. Returns new partitions.
+
+        Plain tables are only converted with `convert=True` (the `migrate`
+        and `partition` commands): conversion locks the tables while the
+        legacy rows are validated against their range, so run it off-peak.
+        Without it, unconverted tables are left alone; creating partitions
+        ahead takes no table-wide locks.
+        """
+        created = []
+        if self.partition_days <= 0:
+            return created
+        period = self._period()
+        now = time.time()
+        current_end = (now // period + 1) * period
+
+        with self._transaction() as cur:
+            converted = False
+            for table, primary_key in PARTITIONED_TABLES.items():
+                cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", (table,))
+                row = cur.fetchone()
+                if row and row[0] != "p":
+                    if not convert:
+                        logger.info("%s is not partitioned yet; run `python -m checkpoint_retention partition`", table)
+                        return created
+                    self._convert(cur, table, primary_key, checkpoint_id_at(current_end))
+                    converted = True
+            if converted:
+                # recreate the secondary indexes and trigger on the partitioned parents
+                cur.execute(CREATE_TABLES_SQL)
+
+        for table in PARTITIONED_TABLES:
+            with self._transaction() as cur:
+                uppers = [checkpoint_id_time(u) for u in self._partitions(cur, table).values() if u]
+                start = max(uppers, default=now // period * period)
+                while start < now + (self.partitions_ahead + 1) * period:
+                    name = f"{table}_p{datetime.fromtimestamp(start, timezone.utc):%Y%m%d}"
+                    cur.execute(
+                        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} FOR VALUES FROM (%s) TO (%s)",
+                        (checkpoint_id_at(start), checkpoint_id_at(start + period))
+                    )
+                    created.append(name)
+                    start += period
+        self._count(partitions_created=len(created))
+        return created
+
+    def drop_expired_partitions(self) -> set:
+        """
+        Drop whole partitions whose every row is older than `max_age_days`;
+        return the threads that lost checkpoints, whose channel blobs
+        (`checkpoint_blobs` is not partitioned) `prune_orphans` must sweep.
+        """
+        touched = set()
+        if self.partition_days <= 0 or self.max_age_days <= 0:
+            return touched
+        cutoff = checkpoint_id_at(time.time() - self.max_age_days * 86400)
+        dropped = 0
+        for table in PARTITIONED_TABLES:
+            with self._transaction() as cur:
+                for name, upper in self._partitions(cur, table).items():
+                    if upper is not None and upper <= cutoff:
+                        if table == "checkpoints":
+                            cur.execute(SELECT_PARTITION_THREADS_SQL.format(partition=name))
+                            touched.update(cur.fetchall())
+                        cur.execute(f"DROP TABLE {name}")
+                        dropped += 1
+        self._count(partitions_dropped=dropped)
+        return touched
+
+    # Scheduling
+
+    def _failed(self, ex: Exception) -> None:
+        with self._lock:
+            self._stats["errors"] += 1
+            self._stats["last_error"] = str(ex)
+
+    def run_once(self) -> Dict[str, Any]:
+        """
+        One maintenance pass: partitions first, then row-level retention and
+        orphans. A failed partition step (e.g. its lock timed out) is counted
+        and logged, and row-level retention still runs.
+        """
+        started = time.perf_counter()
+        touched = set()
+        try:
+            try:
+                self.partition()
+                touched = self.drop_expired_partitions()
+            except Exception as ex:
+                self._failed(ex)
+                logger.warning("Checkpoint partition maintenance failed: %s", ex)
+            touched |= self.prune_max_age() | self.prune_keep_last()
+            self.prune_orphans(touched)
+        except Exception as ex:
+            self._failed(ex)
+            raise
+        finally:
+            with self._lock:
+                self._stats["runs"] += 1
+                self._stats["last_run_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return self.stats()
+
+    def _loop(self, interval: float) -> None:
+        while not self._stop_event.wait(interval):
+            try:
+                self.run_once()
+            except Exception:
+                pass  # counted in stats; retried on the next tick
+
+    def start(self, interval: float) -> None:
+        """Run `run_once` every `interval` seconds on a daemon thread."""
+        if self._thread is None:
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._loop, args=(interval,), name="checkpoint-retention", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "keep_last": self.keep_last,
+                "max_age_days": self.max_age_days,
+                "partition_days": self.partition_days,
+                **self._stats,
+                "blob_sweeps_pending": len(self._pending_sweeps)
+            }
+
+
+def main():
+    from checkpoint_serde import create_serde
+    from config import (
+        POSTGRES_URL,
+        CHECKPOINT_SERDE,
+        CHECKPOINT_COMPRESSION,
+        CHECKPOINT_ZSTD_LEVEL,
+        CHECKPOINT_ALLOW_PICKLE,
+        CHECKPOINT_KEEP_LAST,
+        CHECKPOINT_MAX_AGE_DAYS,
+        CHECKPOINT_RETENTION_BATCH,
+        CHECKPOINT_RETENTION_MAX_BATCHES,
+        CHECKPOINT_RETENTION_INTERVAL,
+        CHECKPOINT_PARTITION_DAYS,
+        CHECKPOINT_PARTITIONS_AHEAD
+    )
+
+    parser = argparse.ArgumentParser(description="Checkpoint schema, retention and partition maintenance")
+    parser.add_argument("command", choices=("migrate", "prune", "partition", "run"),
+                        help="migrate: create/upgrade the schema (converting to partitions with --partition-days); "
+                             "prune: one retention pass; partition: convert to and create partitions; "
+                             "run: prune every --interval seconds (never converts)")
+    parser.add_argument("--keep-last", type=int, default=CHECKPOINT_KEEP_LAST)
+    parser.add_argument("--max-age-days", type=float, default=CHECKPOINT_MAX_AGE_DAYS)
+    parser.add_argument("--batch-size", type=int, default=CHECKPOINT_RETENTION_BATCH)
+    parser.add_argument("--max-batches", type=int, default=CHECKPOINT_RETENTION_MAX_BATCHES)
+    parser.add_argument("--partition-days", type=int, default=CHECKPOINT_PARTITION_DAYS)
+    parser.add_argument("--partitions-ahead", type=int, default=CHECKPOINT_PARTITIONS_AHEAD)
+    parser.add_argument("--interval", type=float, default=CHECKPOINT_RETENTION_INTERVAL or 300)
+    args = parser.parse_args()
+
+    checkpointer = PostgresCheckpointer(
+        POSTGRES_URL,
+        min_size=1,
+        max_size=2,
+        serde=create_serde(CHECKPOINT_SERDE, CHECKPOINT_COMPRESSION, CHECKPOINT_ZSTD_LEVEL, CHECKPOINT_ALLOW_PICKLE),
+        debug_jsonb=CHECKPOINT_SERDE == "jsonb"
+    )
+    retention = CheckpointRetention(
+        checkpointer,
+        keep_last=args.keep_last,
+        max_age_days=args.max_age_days,
+        batch_size=args.batch_size,
+        max_batches=args.max_batches,
+        partition_days=args.partition_days,
+        partitions_ahead=args.partitions_ahead
+    )
+    try:
+        if args.command == "migrate":
+            # PostgresCheckpointer() has just applied the schema (setup=True)
+            print(json.dumps({"migrated": True, "partitions_created": retention.partition(convert=True)}))
+        elif args.command == "partition":
+            print(json.dumps({"created": retention.partition(convert=True)}))
+        elif args.command == "prune":
+            print(json.dumps(retention.run_once()))
+        else:
+            while True:
+                print(json.dumps(retention.run_once()), flush=True)
+                time.sleep(args.interval)
+    finally:
+        checkpointer.close()
+
+
+if __name__ == "__main__":
+    main()
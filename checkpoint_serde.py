@@ -0,0 +1,139 @@
+import pickle
+import threading
+from typing import Any, Optional, Tuple
+
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+
+SERDE_FORMATS = ("msgpack", "pickle", "jsonb")
+COMPRESSIONS = ("none", "zstd")
+
+ZSTD_SUFFIX = "+zstd"
+
+# zstd (de)compressors are not thread-safe, so keep one per thread and level
+_zstd_local = threading.local()
+
+
+def _zstd_compressor(level: int):
+    import zstandard
+    compressors = _zstd_local.__dict__.setdefault("compressors", {})
+    if level not in compressors:
+        compressors[level] = zstandard.ZstdCompressor(level=level)
+    return compressors[level]
+
+
+def _zstd_decompress(payload: bytes) -> bytes:
+    import zstandard
+    if not hasattr(_zstd_local, "decompressor"):
+        _zstd_local.decompressor = zstandard.ZstdDecompressor()
+    return _zstd_local.decompressor.decompress(payload)
+
+
+class PickleSerializer:
+    """
+    Pickle protocol 5 serializer, type tag "pickle".
+
+    Faster than msgpack for large nested state and handles any picklable
+    object, but only load checkpoints written by code you trust.
+    """
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        return "pickle", pickle.dumps(obj, protocol=5)
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        type_, payload = data
+        if type_ != "pickle":
+            raise ValueError(f"PickleSerializer cannot load type {type_!r}")
+        return pickle.loads(payload)
+
+
+class ZstdSerializer:
+    """
+    Wraps another serializer and zstd-compresses payloads of at least
+    `min_size` bytes, marking them with a "+zstd" type tag suffix.
+    Untagged payloads (small ones, or rows written before compression was
+    enabled) are passed to the inner serializer unchanged.
+    """
+
+    def __init__(self, inner: SerializerProtocol, level: int = 3, min_size: int = 512):
+        try:
+            import zstandard  # noqa: F401
+        except ImportError as ex:
+            raise ImportError("zstd compression requires the zstandard package (pip install zstandard)") from ex
+        self.inner = inner
+        self.level = level
+        self.min_size = min_size
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        type_, payload = self.inner.dumps_typed(obj)
+        if len(payload) < self.min_size:
+            return type_, payload
+        return type_ + ZSTD_SUFFIX, _zstd_compressor(self.level).compress(payload)
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        type_, payload = data
+        if type_.endswith(ZSTD_SUFFIX):
+            type_ = type_[:-len(ZSTD_SUFFIX)]
+            payload = _zstd_decompress(payload)
+        return self.inner.loads_typed((type_, payload))
+
+
+class TypedSerializer:
+    """
+    Reads every tag written by the serializers above (msgpack, pickle, and
+    their "+zstd" variants) and writes with `writer`, so switching
+    CHECKPOINT_SERDE does not strand existing rows.
+
+    Unpickling a row runs code chosen by whoever wrote it, so pickle tags
+    are refused unless `allow_pickle` is set.
+    """
+
+    def __init__(self, writer: SerializerProtocol, allow_pickle: bool = False):
+        self.writer = writer
+        self.allow_pickle = allow_pickle
+        self.jsonplus = JsonPlusSerializer()
+        self.pickle = PickleSerializer()
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        return self.writer.dumps_typed(obj)
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        type_, payload = data
+        if type_.endswith(ZSTD_SUFFIX):
+            type_ = type_[:-len(ZSTD_SUFFIX)]
+            payload = _zstd_decompress(payload)
+        if type_ == "pickle":
+            if not self.allow_pickle:
+                raise ValueError(
+                    "refusing to load a pickle checkpoint; set CHECKPOINT_SERDE=pickle "
+                    "or CHECKPOINT_ALLOW_PICKLE=true if these rows are trusted"
+                )
+            return self.pickle.loads_typed((type_, payload))
+        return self.jsonplus.loads_typed((type_, payload))
+
+
+def create_serde(
+    format: str,
+    compression: str = "none",
+    level: int = 3,
+    allow_pickle: bool = False
+) -> Optional[SerializerProtocol]:
+    """
+    Build the checkpoint serializer for `format` ("msgpack", "pickle" or
+    "jsonb") and `compression` ("none" or "zstd"). Pickle rows are only
+    read when `format` is "pickle" or `allow_pickle` is set (e.g. while
+    moving existing pickle rows to msgpack).
+
+    Returns None for "jsonb", which stores plain JSONB for debugging.
+    """
+    if format not in SERDE_FORMATS:
+        raise ValueError(f"unknown checkpoint serde {format!r}; expected one of {SERDE_FORMATS}")
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"unknown checkpoint compression {compression!r}; expected one of {COMPRESSIONS}")
+    if format == "jsonb":
+        return None
+    writer = PickleSerializer() if format == "pickle" else JsonPlusSerializer()
+    if compression == "zstd":
+        writer = ZstdSerializer(writer, level=level)
+    return TypedSerializer(writer, allow_pickle=allow_pickle or format == "pickle")
@@ -0,0 +1,138 @@
+"""Deterministic stand-in for the Groq chat model (LLM_PROVIDER=fake), used offline and by the benchmarks."""
+
+import asyncio
+import json
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+# agent name (as in LLM_NODES) -> marker in its system prompt
+AGENT_MARKERS = {
+    "router": "You are the ROUTER",
+    "safety": "You are the SafetyGuardian Agent",
+    "draft": "You are the Draftsman Agent",
+    "critic": "You are the ClinicalCritic Agent"
+}
+
+
+def agent_of(prompt: str) -> Optional[str]:
+    """Which agent `prompt` was written for, or None."""
+    return next((agent for agent, marker in AGENT_MARKERS.items() if marker in prompt), None)
+
+
+def load_responses(path: str) -> Dict[str, str]:
+    """
+    Per-agent answers from a JSON file such as {"critic": {"score": 40, ...}};
+    objects are re-encoded, strings are returned as written (e.g. to test repairs).
+    """
+    with open(path, encoding="utf-8") as f:
+        responses = json.load(f)
+    unknown = set(responses) - set(AGENT_MARKERS)
+    if unknown:
+        raise ValueError(f"unknown agents in {path}: {sorted(unknown)}")
+    return {agent: answer if isinstance(answer, str) else json.dumps(answer) for agent, answer in responses.items()}
+
+
+def canned_response(prompt: str, draft_chars: int = 0, responses: Optional[Dict[str, str]] = None) -> str:
+    """
+    Pick the JSON answer matching the agent prompt in `prompt` (drafts padded
+    to `draft_chars`); `responses` overrides the answer of individual agents.
+    """
+    agent = agent_of(prompt)
+    if responses and agent in responses:
+        return responses[agent]
+    if agent == "router":
+        query = prompt.split("user query:", 1)[-1].split("\n", 1)[0].strip()
+        return json.dumps({"next_agent": "SafetyGuardian", "payload": query})
+    if agent == "safety":
+        return '```json\n{"safe": true, "response_text": ""}\n```'
+    if agent == "draft":
+        draft = "1. Notice the thought. 2. Rate it. 3. Reframe it."
+        return json.dumps({"draft_text": draft.ljust(draft_chars, " ")})
+    if agent == "critic":
+        return json.dumps({"score": 90, "issues": [], "suggested_edits": ""})
+    return "{}"
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Chat model that sleeps for `latency` seconds and returns canned JSON.
+
+    When streamed, the answer arrives in `stream_chunks` pieces spread over
+    the same total latency. `draft_chars` pads the Draftsman's answer to a
+    realistic exercise length; `responses` replaces the answers of single
+    agents (see `load_responses`).
+    """
+
+    latency: float = 0.2
+    stream_chunks: int = 8
+    draft_chars: int = 0
+    responses: Dict[str, str] = {}
+    model_name: str = "fake-cbt-model"
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-cbt"
+
+    def _result(self, messages: List[BaseMessage]) -> ChatResult:
+        message = AIMessage(content=canned_response(messages[-1].content, self.draft_chars, self.responses))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        time.sleep(self.latency)
+        return self._result(messages)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return self._result(messages)
+
+    def _chunks(self, messages: List[BaseMessage]) -> List[str]:
+        content = canned_response(messages[-1].content, self.draft_chars, self.responses)
+        size = max(1, -(-len(content) // self.stream_chunks))
+        return [content[i:i + size] for i in range(0, len(content), size)]
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any
+    ) -> Iterator[ChatGenerationChunk]:
+        chunks = self._chunks(messages)
+        for text in chunks:
+            time.sleep(self.latency / len(chunks))
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=text))
+            if run_manager:
+                run_manager.on_llm_new_token(text, chunk=chunk)
+            yield chunk
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        chunks = self._chunks(messages)
+        for text in chunks:
+            await asyncio.sleep(self.latency / len(chunks))
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=text))
+            if run_manager:
+                await run_manager.on_llm_new_token(text, chunk=chunk)
+            yield chunk
@@ -0,0 +1,270 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Sequence
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, Generation
+
+
+EVICTION_POLICIES = ("lru", "fifo")
+
+
+def cache_key(prompt: str, llm_string: str) -> str:
+    """
+    Stable key for one LLM call.
+
+    LangChain passes the rendered prompt (template + inputs) as `prompt` and
+    the model identity and parameters (model name, temperature, ...) as
+    `llm_string`, so equal keys mean an equal request.
+    """
+    return hashlib.sha256(f"{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+
+
+def _dump_generations(generations: RETURN_VAL_TYPE) -> str:
+    return json.dumps([
+        {"text": g.text, "message": message_to_dict(g.message)}
+        if isinstance(g, ChatGeneration) else {"text": g.text}
+        for g in generations
+    ])
+
+
+def _load_generations(data: str) -> RETURN_VAL_TYPE:
+    return [
+        ChatGeneration(message=messages_from_dict([g["message"]])[0])
+        if "message" in g else Generation(text=g["text"])
+        for g in json.loads(data)
+    ]
+
+
+class _MemoStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0, "expirations": 0}
+
+    def incr(self, name: str, by: int = 1) -> None:
+        with self._lock:
+            self._stats[name] += by
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0.0
+            }
+
+
+class InMemoryLLMCache(BaseCache):
+    """Bounded in-process LLM response cache with LRU or FIFO eviction and a TTL."""
+
+    def __init__(self, max_entries: int = 2048, ttl: Optional[float] = None, policy: str = "lru"):
+        if policy not in EVICTION_POLICIES:
+            raise ValueError(f"policy must be one of {EVICTION_POLICIES}, got {policy!r}")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.policy = policy
+        self.memo_stats = _MemoStats()
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = cache_key(prompt, llm_string)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and entry[1] + self.ttl <= time.time():
+                del self._entries[key]
+                self.memo_stats.incr("expirations")
+                entry = None
+            if entry is None:
+                self.memo_stats.incr("misses")
+                return None
+            if self.policy == "lru":
+                self._entries.move_to_end(key)
+        self.memo_stats.incr("hits")
+        return entry[0]
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        key = cache_key(prompt, llm_string)
+        with self._lock:
+            self._entries[key] = (return_val, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.memo_stats.incr("evictions")
+        self.memo_stats.incr("writes")
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    async def alookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        return self.lookup(prompt, llm_string)
+
+    async def aupdate(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        self.update(prompt, llm_string, return_val)
+
+    async def aclear(self, **kwargs: Any) -> None:
+        self.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            size = len(self._entries)
+        return {
+            "backend": "memory",
+            "policy": self.policy,
+            "size": size,
+            "max_entries": self.max_entries,
+            **self.memo_stats.snapshot()
+        }
+
+
+class SQLiteLLMCache(BaseCache):
+    """
+    Persistent LLM response cache in a local SQLite file.
+
+    Survives restarts and is shared by workers on the same host. Rows older
+    than `ttl` are ignored and pruned; past `max_entries` the least recently
+    used (or oldest, with policy="fifo") rows are evicted.
+    """
+
+    def __init__(
+        self,
+        path: str = ".llm_cache.sqlite3",
+        max_entries: int = 100_000,
+        ttl: Optional[float] = None,
+        policy: str = "lru"
+    ):
+        if policy not in EVICTION_POLICIES:
+            raise ValueError(f"policy must be one of {EVICTION_POLICIES}, got {policy!r}")
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.policy = policy
+        self.memo_stats = _MemoStats()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                llm_string TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache(last_used)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_created_at ON llm_cache(created_at)")
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = cache_key(prompt, llm_string)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self.ttl is not None and row[1] + self.ttl <= now:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self.memo_stats.incr("expirations")
+                row = None
+            if row is None:
+                self.memo_stats.incr("misses")
+                return None
+            if self.policy == "lru":
+                self._conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (now, key))
+        self.memo_stats.incr("hits")
+        return _load_generations(row[0])
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        key = cache_key(prompt, llm_string)
+        now = time.time()
+        order_by = "last_used" if self.policy == "lru" else "created_at"
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute(
+                    """
+                    INSERT INTO llm_cache (key, llm_string, value, created_at, last_used)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(key) DO UPDATE SET
+                        value = excluded.value,
+                        created_at = excluded.created_at,
+                        last_used = excluded.last_used
+                    """,
+                    (key, llm_string, _dump_generations(return_val), now, now)
+                )
+                if self.ttl is not None:
+                    expired = self._conn.execute(
+                        "DELETE FROM llm_cache WHERE created_at <= ?", (now - self.ttl,)
+                    ).rowcount
+                    self.memo_stats.incr("expirations", expired)
+                (count,) = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+                if count > self.max_entries:
+                    evicted = self._conn.execute(
+                        f"""
+                        DELETE FROM llm_cache WHERE key IN (
+                            SELECT key FROM llm_cache ORDER BY {order_by} LIMIT ?
+                        )
+                        """,
+                        (count - self.max_entries,)
+                    ).rowcount
+                    self.memo_stats.incr("evictions", evicted)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        self.memo_stats.incr("writes")
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            (size,) = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "policy": self.policy,
+            "size": size,
+            "max_entries": self.max_entries,
+            **self.memo_stats.snapshot()
+        }
+
+
+def create_llm_cache(
+    backend: str,
+    *,
+    max_entries: int,
+    ttl: Optional[float] = None,
+    policy: str = "lru",
+    sqlite_path: str = ".llm_cache.sqlite3"
+) -> Optional[BaseCache]:
+    """Build the memoization backend named by `backend` ("memory", "sqlite" or "none")."""
+    if backend == "none":
+        return None
+    if backend == "memory":
+        return InMemoryLLMCache(max_entries=max_entries, ttl=ttl, policy=policy)
+    if backend == "sqlite":
+        return SQLiteLLMCache(sqlite_path, max_entries=max_entries, ttl=ttl, policy=policy)
+    raise ValueError(f"unknown LLM memo backend {backend!r}; expected memory, sqlite or none")
+
+
+def memo_nodes(spec: str, known: Sequence[str]) -> frozenset:
+    """Parse a comma-separated node list ("all" selects every known node)."""
+    names = {name.strip() for name in spec.split(",") if name.strip()}
+    if "all" in names:
+        return frozenset(known)
+    unknown = names - set(known)
+    if unknown:
+        raise ValueError(f"unknown nodes in LLM_MEMO_NODES: {sorted(unknown)}; expected {list(known)}")
+    return frozenset(names)
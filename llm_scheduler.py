@@ -0,0 +1,382 @@
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+
+from telemetry import LLM_QUEUE_SECONDS, LLM_SECONDS, LLM_TOKENS, span
+
+
+class LLMQueueTimeout(TimeoutError):
+    """An LLM call waited longer than `max_queue_time` for a scheduler slot."""
+
+
+def is_rate_limit_error(ex: BaseException) -> bool:
+    """True for provider 429s (groq.RateLimitError and anything carrying status_code 429)."""
+    return getattr(ex, "status_code", None) == 429 or type(ex).__name__ == "RateLimitError"
+
+
+def retry_after(ex: BaseException) -> Optional[float]:
+    """Seconds from the Retry-After header of a provider error, if it sent one."""
+    response = getattr(ex, "response", None)
+    try:
+        return float(response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def parse_priorities(spec: str) -> Dict[str, int]:
+    """"safety,router,critic,draft" -> {"safety": 0, "router": 1, ...}; earlier names go first."""
+    return {name.strip(): rank for rank, name in enumerate(spec.split(",")) if name.strip()}
+
+
+def estimate_tokens(messages: List[BaseMessage], output_tokens: int) -> int:
+    """Rough token cost of a call (~4 characters per prompt token plus the expected output)."""
+    return sum(len(str(message.content)) for message in messages) // 4 + output_tokens
+
+
+class _Bucket:
+    """Token bucket refilled continuously at `per_minute`; disabled when `per_minute` <= 0."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        if self.capacity > 0:
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        if self.capacity <= 0:
+            return 0.0
+        # a call larger than the whole bucket only waits for a full bucket
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate)
+
+    def take(self, amount: float) -> None:
+        if self.capacity > 0:
+            self.level -= amount  # may go negative; later calls then wait it off
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "node", "cost", "enqueued", "granted", "cancelled", "event", "loop", "future")
+
+    def __init__(self, priority: int, seq: int, node: str, cost: int):
+        self.priority = priority
+        self.seq = seq
+        self.node = node
+        self.cost = cost
+        self.enqueued = time.monotonic()
+        self.granted = False
+        self.cancelled = False
+        self.event = None
+        self.loop = None
+        self.future = None
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+    def wake(self) -> None:
+        if self.event is not None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(
+                lambda: self.future.done() or self.future.set_result(None)
+            )
+
+
+class LLMScheduler:
+    """
+    Central admission control for LLM calls, shared by sync and async callers.
+
+    A call waits until fewer than `max_in_flight` calls are running and the
+    requests-per-minute and tokens-per-minute buckets can cover it. Waiting
+    calls are admitted strictly by priority (lower first), then FIFO, so a
+    queue of drafts never delays a safety check. Token costs are estimated
+    before the call and corrected from the provider's usage afterwards.
+
+    A provider 429 pauses all admissions for its Retry-After (or
+    `rate_limit_pause`) instead of letting every caller retry at once, and a
+    call queued longer than `max_queue_time` fails with LLMQueueTimeout.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = 8,
+        rpm: float = 0,
+        tpm: float = 0,
+        max_queue_time: Optional[float] = 60.0,
+        rate_limit_pause: float = 2.0
+    ):
+        self.max_in_flight = max_in_flight
+        self.max_queue_time = max_queue_time
+        self.rate_limit_pause = rate_limit_pause
+        self._requests = _Bucket(rpm)
+        self._tokens = _Bucket(tpm)
+        self._lock = threading.Lock()
+        self._queue: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._timer: Optional[threading.Timer] = None
+        self._timer_due = 0.0
+        self._waits = deque(maxlen=1000)  # (node, queue ms) of recent admissions
+        self._stats = {
+            "admitted": 0,
+            "completed": 0,
+            "rate_limited": 0,
+            "queue_timeouts": 0,
+            "tokens_estimated": 0,
+            "tokens_used": 0
+        }
+
+    def _dispatch(self) -> None:
+        """Admit queued calls while limits allow; call with the lock held."""
+        now = time.monotonic()
+        self._requests.refill(now)
+        self._tokens.refill(now)
+        while self._queue and self._in_flight < self.max_in_flight:
+            waiter = self._queue[0]
+            if waiter.cancelled:
+                heapq.heappop(self._queue)
+                continue
+            delay = max(
+                self._paused_until - now,
+                self._requests.wait_time(1),
+                self._tokens.wait_time(waiter.cost)
+            )
+            if delay > 0:
+                self._dispatch_later(now, delay)
+                return
+            heapq.heappop(self._queue)
+            self._in_flight += 1
+            self._requests.take(1)
+            self._tokens.take(waiter.cost)
+            self._stats["admitted"] += 1
+            self._stats["tokens_estimated"] += waiter.cost
+            self._waits.append((waiter.node, (now - waiter.enqueued) * 1000))
+            LLM_QUEUE_SECONDS.observe(now - waiter.enqueued, node=waiter.node)
+            waiter.granted = True
+            waiter.wake()
+
+    def _dispatch_later(self, now: float, delay: float) -> None:
+        if self._timer is not None and self._timer_due <= now + delay:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(delay, self._on_timer)
+        self._timer.daemon = True
+        self._timer_due = now + delay
+        self._timer.start()
+
+    def _on_timer(self) -> None:
+        with self._lock:
+            self._timer = None
+            self._dispatch()
+
+    def _submit(self, waiter: _Waiter) -> None:
+        with self._lock:
+            heapq.heappush(self._queue, waiter)
+            self._dispatch()
+
+    def _abandon(self, waiter: _Waiter, timed_out: bool) -> bool:
+        """Drop a queued call; False when it was admitted meanwhile and the caller holds the slot."""
+        with self._lock:
+            if waiter.granted:
+                return False
+            waiter.cancelled = True
+            if timed_out:
+                self._stats["queue_timeouts"] += 1
+            return True
+
+    def _release(self, waiter: _Waiter, tokens_used: Optional[int], error: Optional[BaseException]) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            self._stats["completed"] += 1
+            if tokens_used is not None:
+                self._tokens.take(tokens_used - waiter.cost)
+                self._stats["tokens_used"] += tokens_used
+            if error is not None and is_rate_limit_error(error):
+                self._stats["rate_limited"] += 1
+                pause = retry_after(error) or self.rate_limit_pause
+                self._paused_until = max(self._paused_until, time.monotonic() + pause)
+            self._dispatch()
+
+    @contextmanager
+    def slot(self, node: str, priority: int, cost: int) -> Iterator["_Usage"]:
+        """Hold an admission slot for a sync call; record actual tokens on the yielded object."""
+        waiter = _Waiter(priority, next(self._seq), node, cost)
+        waiter.event = threading.Event()
+        self._submit(waiter)
+        if not waiter.event.wait(self.max_queue_time) and self._abandon(waiter, timed_out=True):
+            raise LLMQueueTimeout(f"LLM call for {node!r} queued over {self.max_queue_time}s")
+        usage = _Usage()
+        try:
+            yield usage
+        except BaseException as ex:
+            self._release(waiter, usage.tokens, ex)
+            raise
+        self._release(waiter, usage.tokens, None)
+
+    @asynccontextmanager
+    async def aslot(self, node: str, priority: int, cost: int) -> AsyncIterator["_Usage"]:
+        """Async version of `slot`; waiting does not block the event loop."""
+        waiter = _Waiter(priority, next(self._seq), node, cost)
+        waiter.loop = asyncio.get_running_loop()
+        waiter.future = waiter.loop.create_future()
+        self._submit(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.max_queue_time)
+        except asyncio.TimeoutError:
+            if self._abandon(waiter, timed_out=True):
+                raise LLMQueueTimeout(f"LLM call for {node!r} queued over {self.max_queue_time}s") from None
+        except asyncio.CancelledError:
+            if not self._abandon(waiter, timed_out=False):
+                self._release(waiter, None, None)
+            raise
+        usage = _Usage()
+        try:
+            yield usage
+        except BaseException as ex:
+            self._release(waiter, usage.tokens, ex)
+            raise
+        self._release(waiter, usage.tokens, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            waits = sorted(ms for _, ms in self._waits)
+            by_node: Dict[str, List[float]] = {}
+            for node, ms in self._waits:
+                by_node.setdefault(node, []).append(ms)
+            return {
+                "max_in_flight": self.max_in_flight,
+                "rpm": self._requests.capacity,
+                "tpm": self._tokens.capacity,
+                "in_flight": self._in_flight,
+                "queued": sum(not waiter.cancelled for waiter in self._queue),
+                "paused_s": round(max(0.0, self._paused_until - time.monotonic()), 2),
+                "queue_ms_avg": round(sum(waits) / len(waits), 2) if waits else 0.0,
+                "queue_ms_p95": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 2) if waits else 0.0,
+                "queue_ms_max": round(waits[-1], 2) if waits else 0.0,
+                "queue_ms_avg_by_node": {node: round(sum(ms) / len(ms), 2) for node, ms in by_node.items()},
+                **self._stats
+            }
+
+
+class _Usage:
+    """Filled in by the caller with the tokens the provider reported, if any."""
+    __slots__ = ("tokens", "input_tokens", "output_tokens")
+
+    def __init__(self):
+        self.tokens: Optional[int] = None
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    def record(self, message: Any) -> None:
+        usage = getattr(message, "usage_metadata", None)
+        if usage and usage.get("total_tokens"):
+            self.tokens = (self.tokens or 0) + usage["total_tokens"]
+            self.input_tokens += usage.get("input_tokens", 0)
+            self.output_tokens += usage.get("output_tokens", 0)
+
+    def report(self, node: str, call_span: Any) -> None:
+        """Export the recorded tokens as metrics and attributes of the call's span."""
+        if self.tokens is None:
+            return
+        LLM_TOKENS.inc(self.input_tokens, node=node, kind="input")
+        LLM_TOKENS.inc(self.output_tokens, node=node, kind="output")
+        call_span.set_attribute("gen_ai.usage.input_tokens", self.input_tokens)
+        call_span.set_attribute("gen_ai.usage.output_tokens", self.output_tokens)
+
+
+class ScheduledChatModel(BaseChatModel):
+    """
+    Chat model wrapper that runs every call of `inner` through `scheduler`
+    with the given node name and priority. Streaming is passed through and
+    holds the slot until the last chunk.
+    """
+
+    inner: BaseChatModel
+    scheduler: Any
+    node: str = "llm"
+    priority: int = 0
+    output_tokens: int = 400
+
+    @property
+    def _llm_type(self) -> str:
+        return self.inner._llm_type
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return self.inner._identifying_params
+
+    def _cost(self, messages: List[BaseMessage]) -> int:
+        return estimate_tokens(messages, self.output_tokens)
+
+    def _span(self):
+        # leaf span, not made current: streaming holds it open across yields
+        return span(f"llm {self.node}", LLM_SECONDS, current=False, node=self.node)
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        with self.scheduler.slot(self.node, self.priority, self._cost(messages)) as usage, self._span() as call_span:
+            result = self.inner._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            usage.record(result.generations[0].message)
+            usage.report(self.node, call_span)
+        return result
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        async with self.scheduler.aslot(self.node, self.priority, self._cost(messages)) as usage:
+            with self._span() as call_span:
+                result = await self.inner._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+                usage.record(result.generations[0].message)
+                usage.report(self.node, call_span)
+        return result
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any
+    ) -> Iterator[ChatGenerationChunk]:
+        with self.scheduler.slot(self.node, self.priority, self._cost(messages)) as usage, self._span() as call_span:
+            for chunk in self.inner._stream(messages, stop=stop, **kwargs):
+                usage.record(chunk.message)
+                yield chunk
+            usage.report(self.node, call_span)
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        async with self.scheduler.aslot(self.node, self.priority, self._cost(messages)) as usage:
+            with self._span() as call_span:
+                async for chunk in self.inner._astream(messages, stop=stop, **kwargs):
+                    usage.record(chunk.message)
+                    yield chunk
+                usage.report(self.node, call_span)
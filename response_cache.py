@@ -0,0 +1,173 @@
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+
+Vector = Dict[str, float]
+
+# Negations in normalized text ("don't" normalizes to "don t"); a similar
+# entry whose negations differ from the query's answers the opposite request
+_NEGATION = re.compile(r"\b(?:no|not|never|none|nothing|nor|without|cannot|\w+n t)\b")
+
+
+def normalize(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace."""
+    text = re.sub(r"[^\w\s]", " ", text.lower())
+    return " ".join(text.split())
+
+
+def _unit(vector: Vector) -> Vector:
+    norm = math.sqrt(sum(v * v for v in vector.values()))
+    if not norm:
+        return {}
+    return {k: v / norm for k, v in vector.items()}
+
+
+def _negations(key: str) -> List[str]:
+    return _NEGATION.findall(key)
+
+
+def _dense_to_vector(values: List[float]) -> Vector:
+    return _unit({str(i): v for i, v in enumerate(values)})
+
+
+def cosine(a: Vector, b: Vector) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(k, 0.0) for k, v in a.items())
+
+
+class ResponseCache:
+    """
+    Similarity cache for reviewed CBT pipeline results.
+
+    Lookups first try the normalized text as an exact key. With
+    `embeddings` (any LangChain `Embeddings`) they then scan the local
+    vector index for the most similar entry at or above `threshold`,
+    skipping entries whose negations differ from the query's. Without an
+    embedding model only exact matches of the normalized text hit: surface
+    similarity cannot tell "i am anxious" from "i am not anxious".
+    Entries expire after `ttl` seconds, and the least recently used entry is
+    evicted once `max_entries` is reached.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.92,
+        ttl: float = 3600.0,
+        max_entries: int = 1024,
+        embeddings: Any = None
+    ):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.embeddings = embeddings
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[Optional[Vector], Any, float]]" = OrderedDict()
+        self._stats = {
+            "hits": 0,
+            "exact_hits": 0,
+            "similar_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0
+        }
+
+    def _vector(self, text: str) -> Optional[Vector]:
+        if self.embeddings is None:
+            return None
+        return _dense_to_vector(self.embeddings.embed_query(text))
+
+    async def _avector(self, text: str) -> Optional[Vector]:
+        if self.embeddings is None:
+            return None
+        return _dense_to_vector(await self.embeddings.aembed_query(text))
+
+    def _expire(self, now: float) -> None:
+        expired = [k for k, (_, _, expires_at) in self._entries.items() if expires_at <= now]
+        for key in expired:
+            del self._entries[key]
+        self._stats["expirations"] += len(expired)
+
+    def _lookup(self, key: str, vector: Optional[Vector]) -> Optional[Any]:
+        with self._lock:
+            self._expire(time.monotonic())
+
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                self._stats["exact_hits"] += 1
+                return self._entries[key][1]
+
+            best_key, best_score = None, self.threshold
+            if vector:
+                negated = _negations(key)
+                for candidate, (candidate_vector, _, _) in self._entries.items():
+                    if not candidate_vector or _negations(candidate) != negated:
+                        continue
+                    score = cosine(vector, candidate_vector)
+                    if score >= best_score:
+                        best_key, best_score = candidate, score
+
+            if best_key is None:
+                self._stats["misses"] += 1
+                return None
+
+            self._entries.move_to_end(best_key)
+            self._stats["hits"] += 1
+            self._stats["similar_hits"] += 1
+            return self._entries[best_key][1]
+
+    def _store(self, key: str, vector: Optional[Vector], value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (vector, value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def _needs_vector(self, key: str) -> bool:
+        with self._lock:
+            return key not in self._entries
+
+    def get(self, text: str) -> Optional[Any]:
+        """Cached value for `text` or a similar enough query, else None."""
+        key = normalize(text)
+        vector = self._vector(key) if key and self._needs_vector(key) else None
+        return self._lookup(key, vector)
+
+    async def aget(self, text: str) -> Optional[Any]:
+        """Async version of `get` (embedding calls do not block the loop)."""
+        key = normalize(text)
+        vector = await self._avector(key) if key and self._needs_vector(key) else None
+        return self._lookup(key, vector)
+
+    def put(self, text: str, value: Any) -> None:
+        key = normalize(text)
+        if key:
+            self._store(key, self._vector(key), value)
+
+    async def aput(self, text: str, value: Any) -> None:
+        key = normalize(text)
+        if key:
+            self._store(key, await self._avector(key), value)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "threshold": self.threshold,
+                "ttl": self.ttl,
+                **self._stats,
+                "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0.0
+            }
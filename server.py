@@ -1,19 +1,137 @@
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import FastMCP, Context
 from mcp.types import TextContent
-import httpx,requests
+from contextlib import asynccontextmanager
+import httpx
+import asyncio
 import json
+import os
+import random
+import re
 
-# Create an MCP server
-mcp = FastMCP("mcp-multi-agent-cbt", json_response=True)
+CBT_API_URL = os.getenv("CBT_API_URL", "http://127.0.0.1:8001")
 
-config={
-    "configurable":
-    {
-        "thread_id":1
-    }
-}
+# "http": proxy tool calls to the FastAPI backend at CBT_API_URL (scale the two tiers separately)
+# "embedded": run the compiled graph inside this process, skipping the HTTP/SSE hop
+MCP_PIPELINE_MODE = os.getenv("MCP_PIPELINE_MODE", "http").lower()
+if MCP_PIPELINE_MODE not in ("http", "embedded"):
+    raise ValueError(f"MCP_PIPELINE_MODE must be http or embedded, got {MCP_PIPELINE_MODE!r}")
+
+# Shared HTTP client to the FastAPI backend
+CBT_API_CONNECT_TIMEOUT = float(os.getenv("CBT_API_CONNECT_TIMEOUT", "5"))
+CBT_API_READ_TIMEOUT = float(os.getenv("CBT_API_READ_TIMEOUT", "300"))  # max gap between streamed events
+CBT_API_MAX_CONNECTIONS = int(os.getenv("CBT_API_MAX_CONNECTIONS", "100"))
+CBT_API_MAX_KEEPALIVE = int(os.getenv("CBT_API_MAX_KEEPALIVE", "20"))
+CBT_API_CONCURRENCY = int(os.getenv("CBT_API_CONCURRENCY", "32"))  # pipeline calls in flight
+CBT_API_RETRIES = int(os.getenv("CBT_API_RETRIES", "3"))
+CBT_API_BACKOFF = float(os.getenv("CBT_API_BACKOFF", "0.25"))  # seconds, doubled per attempt
+
+# Failures where the backend has not started the pipeline, so retrying is safe
+RETRY_STATUSES = {429, 502, 503, 504}
+RETRY_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout)
+
+# Stages reported by /mcp-chat/stream, used as the progress scale
+PIPELINE_STAGES = ("router", "safety", "draft", "critic", "finalize")
+
+# Draft tokens are relayed as one log message per sentence, or per this many
+# characters, instead of one JSON-RPC notification per token
+MCP_LOG_CHUNK_CHARS = int(os.getenv("MCP_LOG_CHUNK_CHARS", "200"))
+SENTENCE_END = re.compile(r"[.!?\n][\"'”)\]]*\s*$")
+
+# Create an MCP server (SSE responses so progress notifications reach the client)
+mcp = FastMCP("mcp-multi-agent-cbt", json_response=False)
+
+
+_http_client: httpx.AsyncClient | None = None
+_pipeline_slots = asyncio.Semaphore(CBT_API_CONCURRENCY)
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Keep-alive connection pool shared by every tool call."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            base_url=CBT_API_URL,
+            timeout=httpx.Timeout(CBT_API_READ_TIMEOUT, connect=CBT_API_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=CBT_API_MAX_CONNECTIONS,
+                max_keepalive_connections=CBT_API_MAX_KEEPALIVE
+            )
+        )
+    return _http_client
+
+
+async def close_http_client() -> None:
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
 
 
+def _backoff(attempt: int) -> float:
+    """Jittered exponential backoff before retry number `attempt + 1`."""
+    return CBT_API_BACKOFF * 2 ** attempt * (0.5 + random.random())
+
+
+async def post_with_retries(path: str, payload: dict, stream: bool = False) -> httpx.Response:
+    """
+    POST to the backend, retrying connection failures and 429/5xx responses
+    with jittered exponential backoff. With `stream=True` the caller must
+    close the returned response.
+    """
+    client = get_http_client()
+    for attempt in range(CBT_API_RETRIES + 1):
+        last_attempt = attempt == CBT_API_RETRIES
+        try:
+            response = await client.send(client.build_request("POST", path, json=payload), stream=stream)
+        except RETRY_ERRORS:
+            if last_attempt:
+                raise
+        else:
+            if response.status_code not in RETRY_STATUSES or last_attempt:
+                return response
+            await response.aclose()
+        await asyncio.sleep(_backoff(attempt))
+
+
+async def iter_sse(response: httpx.Response):
+    """Yield (event, data) pairs from a text/event-stream response."""
+    event, data = "message", []
+    async for line in response.aiter_lines():
+        if not line:
+            if data:
+                yield event, json.loads("\n".join(data))
+            event, data = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data.append(line[len("data:"):].strip())
+
+
+async def _http_pipeline_events(payload: dict):
+    result = await post_with_retries("/mcp-chat/stream", payload, stream=True)
+    try:
+        result.raise_for_status()
+        async for event, data in iter_sse(result):
+            yield event, data
+    finally:
+        await result.aclose()
+
+
+async def pipeline_events(user_input: str, thread_id: str | None = None):
+    """
+    Yield the pipeline's (event, data) pairs, either from the backend's
+    /mcp-chat/stream endpoint or, in embedded mode, straight from the graph
+    in this process. Both produce the same start/stage/token/final/error events.
+    """
+    if MCP_PIPELINE_MODE == "embedded":
+        # Imported on first use: builds the graph and opens the checkpointer
+        from main import stream_pipeline_events
+        events = stream_pipeline_events(user_input, thread_id)
+    else:
+        events = _http_pipeline_events({"user_input": user_input, "thread_id": thread_id})
+    async for event, data in events:
+        yield event, data
+
 
 @mcp.tool()
 def add(a: int, b: int) -> int:
@@ -21,7 +139,7 @@ def add(a: int, b: int) -> int:
     return a + b
 
 @mcp.tool()
-def run_cbt_pipeline(user_input:str)->TextContent:
+async def run_cbt_pipeline(user_input:str,thread_id:str|None=None,ctx:Context|None=None)->TextContent:
     """
 Health Assistance and Cognitive Behavioral Therapy
     
@@ -42,17 +160,95 @@ instead of a CBT exercise.
 
 Input:
 - user_input (str): A brief description of the CBT task
+- thread_id (str, optional): Conversation id to continue; a new one is used when omitted
 
 Output:
 - A structured, easy-to-follow CBT exercise in plain language
+
+Progress is streamed while the pipeline runs: one progress notification per
+completed stage and the draft text as log messages, a sentence at a time.
 """
 
-    payload={"user_input":user_input}
-    result=requests.post(url="http://127.0.0.1:8001/mcp-chat",json=payload)
-    res=result.json()
-    response_text=res.get("response",str(res))
+    response_text=None
+    completed=0
+    draft=[]
+
+    async def flush_draft():
+        if draft and ctx:
+            await ctx.info("".join(draft))
+        draft.clear()
+
+    async with _pipeline_slots:
+        for attempt in range(CBT_API_RETRIES + 1):
+            wait=None
+            async for event, data in pipeline_events(user_input,thread_id):
+                if event=="token":
+                    draft.append(data["text"])
+                    if SENTENCE_END.search(data["text"]) or sum(map(len,draft))>=MCP_LOG_CHUNK_CHARS:
+                        await flush_draft()
+                    continue
+                await flush_draft()
+                if event=="stage" and data["status"]=="completed" and data["stage"] in PIPELINE_STAGES:
+                    completed+=1
+                    if ctx:
+                        await ctx.report_progress(completed,len(PIPELINE_STAGES),f"{data['stage']} completed")
+                elif event=="final":
+                    response_text=data["response"]
+                elif event=="error":
+                    # LLM saturated before any stage finished: nothing was reported, so rerun it
+                    if data.get("retryable") and completed==0 and attempt<CBT_API_RETRIES:
+                        wait=max(data.get("retry_after") or 0, _backoff(attempt))
+                    else:
+                        response_text=f"CBT pipeline failed: {data['detail']}"
+            if wait is None:
+                break
+            await asyncio.sleep(wait)
+
+    if response_text is None:
+        response_text="CBT pipeline ended without a result"
     return TextContent(type="text",text=response_text)
 
+async def pipeline_batch(user_inputs: list[str], max_concurrency: int | None = None) -> dict:
+    """Run a batch through /mcp-chat/batch, or in embedded mode through the in-process graph."""
+    if MCP_PIPELINE_MODE == "embedded":
+        from main import User, run_pipeline_batch
+        return await run_pipeline_batch([User(user_input=text) for text in user_inputs], max_concurrency)
+    payload = {"items": [{"user_input": text} for text in user_inputs], "max_concurrency": max_concurrency}
+    response = await post_with_retries("/mcp-chat/batch", payload)
+    response.raise_for_status()
+    return response.json()
+
+
+@mcp.tool()
+async def run_cbt_pipeline_batch(user_inputs:list[str],max_concurrency:int|None=None,ctx:Context|None=None)->TextContent:
+    """
+Generate CBT exercises for many requests at once (for example a weekly
+worksheet set for a group), using the same multi-agent workflow and safety
+checks as run_cbt_pipeline.
+
+Input:
+- user_inputs (list[str]): One brief CBT task description per exercise
+- max_concurrency (int, optional): Requests processed at the same time
+  (the server caps this)
+
+Output:
+- JSON with one entry per input, in order: {"index", "thread_id", "response"}
+  on success or {"index", "thread_id", "error"} on failure, plus
+  "succeeded"/"failed" counts
+"""
+
+    async with _pipeline_slots:
+        batch = await pipeline_batch(user_inputs, max_concurrency)
+    if ctx:
+        await ctx.info(f"{batch['succeeded']} of {len(user_inputs)} exercises generated in {batch['elapsed_ms']} ms")
+    results = [{key: item[key] for key in ("index", "thread_id", "response", "error") if key in item}
+               for item in batch["results"]]
+    return TextContent(type="text", text=json.dumps({
+        "results": results,
+        "succeeded": batch["succeeded"],
+        "failed": batch["failed"]
+    }))
+
 # Add a dynamic greeting resource
 @mcp.resource("greeting://{name}")
 def get_greeting(name: str) -> str:
@@ -73,8 +269,48 @@ def greet_user(name: str, style: str = "friendly") -> str:
     return f"{styles.get(style, styles['friendly'])} for someone named {name}."
 
 
+@asynccontextmanager
+async def runtime():
+    """
+    Process lifetime resources. Embedded mode builds the graph and starts
+    checkpoint retention before the first tool call, like the FastAPI
+    backend's lifespan, and flushes and closes the checkpointer on
+    shutdown; both modes close the shared HTTP client.
+    """
+    if MCP_PIPELINE_MODE == "embedded":
+        import main
+        await main.start_runtime()
+    try:
+        yield
+    finally:
+        await close_http_client()
+        if MCP_PIPELINE_MODE == "embedded":
+            await main.close_runtime()
+
+
+def streamable_http_app():
+    """
+    mcp's Starlette app with `runtime` around its own lifespan. (FastMCP's
+    `lifespan` argument runs once per MCP session, not once per process.)
+    """
+    app = mcp.streamable_http_app()
+    session_manager_lifespan = app.router.lifespan_context
+
+    @asynccontextmanager
+    async def lifespan(app):
+        async with runtime(), session_manager_lifespan(app):
+            yield
+
+    app.router.lifespan_context = lifespan
+    return app
 
 
 # Run with streamable HTTP transport
 if __name__ == "__main__":
-    mcp.run(transport="streamable-http")
\ No newline at end of file
+    import uvicorn
+    uvicorn.run(
+        streamable_http_app(),
+        host=mcp.settings.host,
+        port=mcp.settings.port,
+        log_level=mcp.settings.log_level.lower()
+    )
\ No newline at end of file
@@ -0,0 +1,235 @@
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Sequence
+
+from langgraph.checkpoint.base import BaseCheckpointSaver, Checkpoint, CheckpointTuple
+
+from postgres_connector import NOTIFY_CHANNEL, CheckpointChannels, aread_channels, read_channels
+
+
+class _Watch:
+    """Wakes one waiting request when its thread changes; set from any thread."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.event = asyncio.Event()
+
+    def notify(self) -> None:
+        self.loop.call_soon_threadsafe(self.event.set)
+
+    async def wait(self, timeout: float) -> bool:
+        """Wait up to `timeout` seconds for a change; clears the flag for the next wait."""
+        try:
+            await asyncio.wait_for(self.event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self.event.clear()
+
+
+class WorkflowStateCache:
+    """
+    Read-through cache of the `channels` of each thread's latest checkpoint
+    for /workflow-state. Only those channels are read from the saver (via
+    `get_channels` where it has one), so misses stay cheap too.
+
+    Entries are dropped by `invalidate(thread_id)`, which the
+    InvalidatingCheckpointer calls on every `put`/`put_writes` in this
+    process and the Postgres listener calls for checkpoints written by other
+    workers. A read that races an invalidation is returned but not stored,
+    so the cache never holds a checkpoint older than the last invalidation.
+
+    `watch()` lets long-poll and SSE requests sleep until a thread changes.
+    """
+
+    def __init__(self, saver: BaseCheckpointSaver, channels: Sequence[str], max_entries: int = 1024):
+        self.saver = saver
+        self.channels = tuple(channels)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Optional[CheckpointChannels]]" = OrderedDict()
+        # generation of the last invalidation per thread; threads not listed
+        # count as changed at `_floor`, the generation of the last prune
+        self._generation = 0
+        self._changed: Dict[str, int] = {}
+        self._floor = 0
+        self._watches: Dict[str, set] = {}
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0, "notifications": 0, "listener_errors": 0}
+
+    def invalidate(self, thread_id: str) -> None:
+        with self._lock:
+            self._generation += 1
+            self._changed[thread_id] = self._generation
+            self._entries.pop(thread_id, None)
+            self._stats["invalidations"] += 1
+            if len(self._changed) > 4 * self.max_entries:
+                self._changed.clear()
+                self._floor = self._generation
+            watches = list(self._watches.get(thread_id, ()))
+        for watch in watches:
+            watch.notify()
+
+    def clear(self) -> None:
+        """Forget everything, e.g. after notifications may have been missed."""
+        with self._lock:
+            self._generation += 1
+            self._floor = self._generation
+            self._changed.clear()
+            self._entries.clear()
+            watches = [watch for watches in self._watches.values() for watch in watches]
+        for watch in watches:
+            watch.notify()
+
+    async def aget(self, thread_id: str) -> Optional[CheckpointChannels]:
+        """Channels of the thread's latest checkpoint (root namespace), from cache when valid."""
+        with self._lock:
+            if thread_id in self._entries:
+                self._entries.move_to_end(thread_id)
+                self._stats["hits"] += 1
+                return self._entries[thread_id]
+            self._stats["misses"] += 1
+            started = self._generation
+        snapshot = await aread_channels(
+            self.saver,
+            {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}},
+            self.channels
+        )
+        with self._lock:
+            if self._changed.get(thread_id, self._floor) <= started:
+                self._entries[thread_id] = snapshot
+                self._entries.move_to_end(thread_id)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return snapshot
+
+    def watch(self, thread_id: str) -> _Watch:
+        """Register for change notifications of a thread; pair with `unwatch`."""
+        watch = _Watch(asyncio.get_running_loop())
+        with self._lock:
+            self._watches.setdefault(thread_id, set()).add(watch)
+        return watch
+
+    def unwatch(self, thread_id: str, watch: _Watch) -> None:
+        with self._lock:
+            watches = self._watches.get(thread_id)
+            if watches is not None:
+                watches.discard(watch)
+                if not watches:
+                    del self._watches[thread_id]
+
+    async def listen(self, connection_string: str, retry_interval: float = 5.0) -> None:
+        """
+        Invalidate threads named by Postgres NOTIFYs on NOTIFY_CHANNEL (sent
+        by a trigger on checkpoint inserts) until cancelled. After a lost
+        connection the whole cache is cleared, since notifications may have
+        been missed.
+        """
+        import psycopg
+
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(connection_string, autocommit=True) as conn:
+                    await conn.execute(f"LISTEN {NOTIFY_CHANNEL}")
+                    self.clear()
+                    async for notify in conn.notifies():
+                        with self._lock:
+                            self._stats["notifications"] += 1
+                        self.invalidate(notify.payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                with self._lock:
+                    self._stats["listener_errors"] += 1
+                self.clear()
+                await asyncio.sleep(retry_interval)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "watching": sum(len(watches) for watches in self._watches.values()),
+                **self._stats,
+                "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0.0
+            }
+
+
+class InvalidatingCheckpointer(BaseCheckpointSaver):
+    """Delegates to `saver` and invalidates `cache` for every thread written to."""
+
+    def __init__(self, saver: BaseCheckpointSaver, cache: WorkflowStateCache):
+        super().__init__(serde=saver.serde)
+        self.saver = saver
+        self.cache = cache
+
+    def _invalidate(self, config: Dict[str, Any]) -> None:
+        thread_id = config.get("configurable", {}).get("thread_id")
+        if thread_id:
+            self.cache.invalidate(thread_id)
+
+    def get_next_version(self, current: Optional[Any], channel: None) -> Any:
+        return self.saver.get_next_version(current, channel)
+
+    def get_tuple(self, config: Dict[str, Any]) -> Optional[CheckpointTuple]:
+        return self.saver.get_tuple(config)
+
+    async def aget_tuple(self, config: Dict[str, Any]) -> Optional[CheckpointTuple]:
+        return await self.saver.aget_tuple(config)
+
+    def get_channels(self, config: Dict[str, Any], channels: Sequence[str]) -> Optional[CheckpointChannels]:
+        return read_channels(self.saver, config, channels)
+
+    async def aget_channels(self, config: Dict[str, Any], channels: Sequence[str]) -> Optional[CheckpointChannels]:
+        return await aread_channels(self.saver, config, channels)
+
+    def list(self, config: Optional[Dict[str, Any]] = None, **kwargs: Any) -> Iterator[CheckpointTuple]:
+        yield from self.saver.list(config, **kwargs)
+
+    async def alist(self, config: Optional[Dict[str, Any]] = None, **kwargs: Any) -> AsyncIterator[CheckpointTuple]:
+        async for item in self.saver.alist(config, **kwargs):
+            yield item
+
+    def put(
+        self,
+        config: Dict[str, Any],
+        checkpoint: Checkpoint,
+        metadata: Dict[str, Any],
+        new_versions: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        next_config = self.saver.put(config, checkpoint, metadata, new_versions)
+        self._invalidate(config)
+        return next_config
+
+    async def aput(
+        self,
+        config: Dict[str, Any],
+        checkpoint: Checkpoint,
+        metadata: Dict[str, Any],
+        new_versions: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        next_config = await self.saver.aput(config, checkpoint, metadata, new_versions)
+        self._invalidate(config)
+        return next_config
+
+    def put_writes(
+        self,
+        config: Dict[str, Any],
+        writes: Sequence[tuple],
+        task_id: str,
+        task_path: str = ""
+    ) -> None:
+        self.saver.put_writes(config, writes, task_id, task_path)
+        self._invalidate(config)
+
+    async def aput_writes(
+        self,
+        config: Dict[str, Any],
+        writes: Sequence[tuple],
+        task_id: str,
+        task_path: str = ""
+    ) -> None:
+        await self.saver.aput_writes(config, writes, task_id, task_path)
+        self._invalidate(config)
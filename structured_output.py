@@ -0,0 +1,293 @@
+import ast
+import json
+import math
+import threading
+from typing import Any, Dict, List, Tuple, Type
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from pydantic import BaseModel, ConfigDict, Field, ValidationError, field_validator, model_validator
+
+
+class AgentOutput(BaseModel):
+    """Base for agent schemas: extra keys are kept, nulls fall back to the field default."""
+    model_config = ConfigDict(extra="allow")
+
+    @model_validator(mode="before")
+    @classmethod
+    def _drop_nulls(cls, value: Any) -> Any:
+        if isinstance(value, dict):
+            return {key: item for key, item in value.items() if item is not None}
+        return value
+
+
+class RouterOutput(AgentOutput):
+    next_agent: str = "SafetyGuardian"
+    payload: str
+
+
+class SafetyOutput(AgentOutput):
+    safe: bool
+    response_text: str = ""
+
+
+class DraftOutput(AgentOutput):
+    draft_text: str
+
+
+class CriticOutput(AgentOutput):
+    score: int = Field(ge=0, le=100)
+    issues: List[Any] = []
+    suggested_edits: str = ""
+
+    @field_validator("score", mode="before")
+    @classmethod
+    def _round(cls, value: Any) -> Any:
+        # models often grade 85.7 / 100; rounding beats re-asking for an int
+        return round(value) if isinstance(value, float) and math.isfinite(value) else value
+
+    @field_validator("issues", mode="before")
+    @classmethod
+    def _listify(cls, value: Any) -> Any:
+        if value == "":
+            return []
+        return [value] if isinstance(value, (str, dict)) else value
+
+
+AGENT_SCHEMAS: Dict[str, Type[BaseModel]] = {
+    "router": RouterOutput,
+    "safety": SafetyOutput,
+    "draft": DraftOutput,
+    "critic": CriticOutput
+}
+
+_CLOSERS = {"{": "}", "[": "]"}
+_LITERALS = {"True": "true", "False": "false", "None": "null"}
+# a string opened with a curly quote is closed by one, a straight quote by a straight one
+_QUOTES = {'"': '"', "“": "”"}
+
+
+class StructuredOutputError(ValueError):
+    """Model output for `node` could not be turned into its schema."""
+
+    def __init__(self, node: str, reason: str, text: str):
+        super().__init__(f"{node} output invalid: {reason}")
+        self.node = node
+        self.reason = reason
+        self.text = text
+
+
+class JsonObjectExtractor:
+    """
+    Finds the first top-level JSON object in model output fed chunk by chunk,
+    skipping any prose or code fences around it. Each character is looked at
+    once, so a stream can stop as soon as `complete` turns true.
+    """
+
+    def __init__(self):
+        self._parts: List[str] = []
+        self._stack: List[str] = []
+        self._quote = None  # closing quote of the string being scanned
+        self._escape = False
+        self.complete = False
+
+    def feed(self, chunk: str) -> bool:
+        """Consume more output; returns True once the object has closed."""
+        if self.complete:
+            return True
+        start = 0
+        if not self._stack:
+            start = chunk.find("{")
+            if start < 0:
+                return False
+        for i in range(start, len(chunk)):
+            ch = chunk[i]
+            if self._quote:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == self._quote:
+                    self._quote = None
+            elif ch in _QUOTES:
+                self._quote = _QUOTES[ch]
+            elif ch in _CLOSERS:
+                self._stack.append(_CLOSERS[ch])
+            elif self._stack and ch == self._stack[-1]:
+                self._stack.pop()
+                if not self._stack:
+                    self._parts.append(chunk[start:i + 1])
+                    self.complete = True
+                    return True
+        self._parts.append(chunk[start:])
+        return False
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+
+    @property
+    def missing_closers(self) -> str:
+        """What a truncated object needs appended: an open string's quote, then brackets."""
+        return ('"' if self._quote else "") + "".join(reversed(self._stack))
+
+
+def extract_json(text: str) -> Tuple[str, str]:
+    """Return (object text, closers it is missing) for the first JSON object in `text`."""
+    extractor = JsonObjectExtractor()
+    extractor.feed(text)
+    return extractor.text, "" if extractor.complete else extractor.missing_closers
+
+
+def _drop_trailing_comma(out: List[str]) -> None:
+    i = len(out) - 1
+    while i >= 0 and out[i].isspace():
+        i -= 1
+    if i >= 0 and out[i] == ",":
+        del out[i]
+
+
+def repair_json(text: str, missing: str = "") -> str:
+    """
+    Lenient fixes for common model mistakes, applied in one pass: raw
+    newlines/control characters inside strings, smart quotes, trailing
+    commas, Python True/False/None, and (via `missing`) truncated output.
+    """
+    out: List[str] = []
+    quote = None
+    escape = False
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if quote:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == quote:
+                quote = None
+                ch = '"'
+            elif ch == '"':
+                ch = '\\"'  # straight quote inside a curly-quoted string
+            elif ch < " ":
+                ch = {"\n": "\\n", "\r": "\\r", "\t": "\\t"}.get(ch, f"\\u{ord(ch):04x}")
+            out.append(ch)
+        elif ch in _QUOTES:
+            quote = _QUOTES[ch]
+            out.append('"')
+        elif ch in "}]":
+            _drop_trailing_comma(out)
+            out.append(ch)
+        else:
+            literal = next((word for word in _LITERALS if text.startswith(word, i)), None)
+            if literal is not None and not (i and (text[i - 1].isalnum() or text[i - 1] == "_")):
+                out.append(_LITERALS[literal])
+                i += len(literal)
+                continue
+            out.append(ch)
+        i += 1
+    for closer in missing:
+        if closer != '"':
+            _drop_trailing_comma(out)
+        out.append(closer)
+    return "".join(out)
+
+
+def loads_lenient(text: str) -> Tuple[Any, bool]:
+    """
+    Parse the first JSON object in `text`; returns (value, repaired?).
+
+    A brace in the prose before the object (e.g. "use a {name}
+    placeholder") yields a candidate that does not parse; extraction then
+    resumes at the next "{" after it. The error of the longest candidate is
+    raised when none parses.
+    """
+    start = text.find("{")
+    if start < 0:
+        raise ValueError("no JSON object found")
+    failure = None
+    while start >= 0:
+        candidate, missing = extract_json(text[start:])
+        try:
+            return _loads_candidate(candidate, missing)
+        except ValueError as ex:
+            if failure is None or len(candidate) > failure[0]:
+                failure = (len(candidate), ex)
+        # a complete object is skipped whole; a truncated one may be a stray "{"
+        start = text.find("{", start + (1 if missing else len(candidate)))
+    raise failure[1]
+
+
+def _loads_candidate(candidate: str, missing: str) -> Tuple[Any, bool]:
+    if not missing:
+        try:
+            return json.loads(candidate), False
+        except json.JSONDecodeError:
+            pass
+    try:
+        return json.loads(repair_json(candidate, missing)), True
+    except json.JSONDecodeError as ex:
+        try:
+            # single-quoted keys/strings: a Python dict literal
+            value = ast.literal_eval(candidate + missing)
+        except (ValueError, SyntaxError, MemoryError, RecursionError):
+            value = None
+        if not isinstance(value, dict):  # "{1, 2}" in prose is a set literal
+            raise ValueError(f"invalid JSON: {ex}") from None
+        return value, True
+
+
+class StructuredOutputParser:
+    """
+    Shared parser for agent output: extracts the JSON object, repairs it if
+    needed and validates it against the node's schema, returning a plain
+    dict. Counts clean parses, repairs, re-asks and failures per node.
+    """
+
+    def __init__(self, schemas: Dict[str, Type[BaseModel]] = AGENT_SCHEMAS):
+        self.schemas = schemas
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def count(self, node: str, outcome: str) -> None:
+        with self._lock:
+            counts = self._stats.setdefault(node, {"clean": 0, "repaired": 0, "invalid": 0, "reasks": 0, "failed": 0})
+            counts[outcome] += 1
+
+    def parse(self, node: str, text: str) -> Dict[str, Any]:
+        """Validated output of `node` as a dict; raises StructuredOutputError."""
+        try:
+            value, repaired = loads_lenient(text)
+            if not isinstance(value, dict):
+                raise ValueError(f"expected a JSON object, got {type(value).__name__}")
+            result = self.schemas[node].model_validate(value).model_dump()
+        except (ValueError, ValidationError) as ex:
+            self.count(node, "invalid")
+            reason = str(ex).splitlines()[0] if not isinstance(ex, ValidationError) else "; ".join(
+                f"{'.'.join(map(str, error['loc'])) or 'value'}: {error['msg']}" for error in ex.errors()
+            )
+            raise StructuredOutputError(node, reason, text) from None
+        self.count(node, "repaired" if repaired else "clean")
+        return result
+
+    def reask_messages(self, node: str, prompt_messages: List[BaseMessage], error: StructuredOutputError) -> List[BaseMessage]:
+        """The original prompt, the rejected answer and a request to fix only what was wrong."""
+        schema = json.dumps(self.schemas[node].model_json_schema()["properties"])
+        return [
+            *prompt_messages,
+            AIMessage(content=error.text),
+            HumanMessage(content=(
+                f"Your reply could not be used ({error.reason}). Reply again with only one JSON "
+                f"object, no other text, with these fields: {schema}"
+            ))
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = {}
+            for node, counts in self._stats.items():
+                parsed = counts["clean"] + counts["repaired"] + counts["invalid"]
+                stats[node] = {
+                    **counts,
+                    "invalid_rate": round(counts["invalid"] / parsed, 4) if parsed else 0.0
+                }
+            return stats
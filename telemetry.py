@@ -0,0 +1,266 @@
+import functools
+import inspect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Prometheus text exposition format served by /metrics
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; wide enough for pool waits (ms) up to slow draft generations (tens of s)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {_escape(self.help)}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonic total per label set."""
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_label_text(self.labelnames, key)} {_number(value)}" for key, value in values
+        ]
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket latency histogram per label set, in seconds."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], list] = {}  # key -> [bucket counts, sum, count]
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            snapshot = sorted((key, list(counts), total, count) for key, (counts, total, count) in self._series.items())
+        lines = self.header()
+        for key, counts, total, count in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, math.inf), counts):
+                cumulative += bucket_count
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_label_text(self.labelnames, key, le)} {cumulative}")
+            labels = _label_text(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_number(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Gauge(_Metric):
+    """Value read from a callback at scrape time (queue depth, connections in use, ...)."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, read: Callable[[], float]):
+        super().__init__(name, help)
+        self.read = read
+
+    def collect(self) -> List[str]:
+        try:
+            value = self.read()
+        except Exception:
+            return []
+        return self.header() + [f"{self.name} {_number(value)}"]
+
+
+class MetricsRegistry:
+    """Metrics rendered together by /metrics; names must be unique."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _add(self, metric: _Metric) -> Any:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"metric {metric.name} already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def gauge(self, name: str, help: str, read: Callable[[], float]) -> Gauge:
+        """Register (or replace, e.g. after a reload) a scrape-time gauge."""
+        gauge = Gauge(name, help, read)
+        with self._lock:
+            self._metrics[name] = gauge
+        return gauge
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for metric in metrics for line in metric.collect()) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+NODE_SECONDS = REGISTRY.histogram(
+    "cbt_node_duration_seconds", "Wall time of each graph node", ("node",)
+)
+LLM_SECONDS = REGISTRY.histogram(
+    "cbt_llm_request_duration_seconds", "LLM call time after scheduler admission", ("node",)
+)
+LLM_QUEUE_SECONDS = REGISTRY.histogram(
+    "cbt_llm_queue_wait_seconds", "Time LLM calls waited for scheduler admission", ("node",)
+)
+LLM_TOKENS = REGISTRY.counter(
+    "cbt_llm_tokens_total", "Tokens reported by the LLM provider", ("node", "kind")
+)
+CHECKPOINTER_SECONDS = REGISTRY.histogram(
+    "cbt_checkpointer_duration_seconds", "Postgres checkpointer call time, pool wait included", ("operation",)
+)
+DB_POOL_WAIT_SECONDS = REGISTRY.histogram(
+    "cbt_db_pool_wait_seconds", "Time spent waiting for a pooled Postgres connection", ("pool",)
+)
+
+
+class _NoopSpan:
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def record_exception(self, exception: BaseException, **kwargs: Any) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+_tracer = None  # opentelemetry Tracer once configure_tracing(True) ran
+
+
+def configure_tracing(enabled: bool, service_name: str = "cbt-pipeline") -> None:
+    """
+    Turn OpenTelemetry spans on or off (off by default: spans cost nothing).
+
+    Spans go through the OpenTelemetry API, so a tracer provider set up by
+    the process (e.g. under `opentelemetry-instrument`) receives them. When
+    none is set and opentelemetry-sdk plus the OTLP exporter are installed,
+    one exporting to the standard OTEL_EXPORTER_OTLP_* endpoint is installed.
+    """
+    global _tracer
+    if not enabled:
+        _tracer = None
+        return
+    try:
+        from opentelemetry import trace
+    except ImportError as ex:
+        raise ImportError("OTEL_TRACING requires the opentelemetry-api package (pip install '.[otel]')") from ex
+
+    if isinstance(trace.get_tracer_provider(), trace.ProxyTracerProvider):
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+            from opentelemetry.sdk.resources import Resource
+            from opentelemetry.sdk.trace import TracerProvider
+            from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        except ImportError:
+            pass  # API only: spans stay no-ops until the process installs a provider
+        else:
+            provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+            provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+            trace.set_tracer_provider(provider)
+    _tracer = trace.get_tracer("cbt_pipeline")
+
+
+@contextmanager
+def span(name: str, histogram: Optional[Histogram] = None, current: bool = True, **labels: Any) -> Iterator[Any]:
+    """
+    Time a block into `histogram` (labelled with `labels`) and, when tracing
+    is on, wrap it in a span carrying the labels as `cbt.*` attributes.
+
+    `current=False` starts the span without making it the active context;
+    use it for leaf spans held across yields of a generator (streaming LLM
+    calls), where attaching the context would leak into the consumer.
+    """
+    started = time.perf_counter()
+    try:
+        if _tracer is None:
+            yield _NOOP_SPAN
+        else:
+            attributes = {f"cbt.{key}": str(value) for key, value in labels.items()}
+            if current:
+                with _tracer.start_as_current_span(name, attributes=attributes) as active:
+                    yield active
+            else:
+                with _tracer.start_span(name, attributes=attributes) as active:
+                    yield active
+    finally:
+        if histogram is not None:
+            histogram.observe(time.perf_counter() - started, **labels)
+
+
+def timed(name: str, histogram: Histogram, **labels: Any):
+    """Decorator form of `span` (leaf span) for plain and async functions."""
+    def decorate(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name, histogram, current=False, **labels):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name, histogram, current=False, **labels):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
@@ -0,0 +1,65 @@
+import atexit
+import unittest
+from unittest import mock
+
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.checkpoint.memory import MemorySaver
+
+from checkpoint_buffer import WriteBehindCheckpointer
+
+
+class PoisonedSaver(MemorySaver):
+    """Rejects checkpoints of thread "bad" the way a serializer error would."""
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        if config["configurable"]["thread_id"] == "bad":
+            raise TypeError("Object of type set is not serializable")
+        return super().put(config, checkpoint, metadata, new_versions)
+
+
+def put(buffer: WriteBehindCheckpointer, thread_id: str) -> None:
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+    buffer.put(config, empty_checkpoint(), {}, {})
+
+
+class WriteBehindCheckpointerTest(unittest.TestCase):
+    def test_failing_operation_is_dropped_after_retries(self):
+        saver = PoisonedSaver()
+        buffer = WriteBehindCheckpointer(saver, mode="exit", max_retries=2)
+        self.addCleanup(buffer.close)
+        for thread_id in ("good-1", "bad", "good-2"):
+            put(buffer, thread_id)
+
+        for _ in range(3):  # first attempt plus max_retries
+            with self.assertRaises(TypeError):
+                buffer.flush()
+        with self.assertLogs("checkpoint_buffer", "ERROR"):
+            buffer.flush()
+
+        stats = buffer.stats()
+        self.assertEqual((stats["pending"], stats["dropped_ops"], stats["flush_errors"]), (0, 1, 3))
+        for thread_id in ("good-1", "good-2"):
+            self.assertIsNotNone(saver.get_tuple({"configurable": {"thread_id": thread_id}}))
+
+    def test_transient_errors_are_retried_forever(self):
+        saver = MemorySaver()
+        buffer = WriteBehindCheckpointer(saver, mode="exit", max_retries=0)
+        self.addCleanup(buffer.close)
+        put(buffer, "thread")
+        with mock.patch.object(saver, "put", side_effect=ConnectionError("database is down")):
+            for _ in range(3):
+                with self.assertRaises(ConnectionError):
+                    buffer.flush()
+        buffer.flush()
+        self.assertEqual((buffer.stats()["pending"], buffer.stats()["dropped_ops"]), (0, 0))
+
+    def test_close_unregisters_exit_hook(self):
+        with mock.patch.object(atexit, "register") as register, mock.patch.object(atexit, "unregister") as unregister:
+            buffer = WriteBehindCheckpointer(MemorySaver(), mode="interval")
+            buffer.close()
+        register.assert_called_once_with(buffer.close)
+        unregister.assert_called_once_with(buffer.close)
+
+
+if __name__ == "__main__":
+    unittest.main()
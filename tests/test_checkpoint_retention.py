@@ -0,0 +1,99 @@
+"""
+CheckpointRetention against a real database. Tables are dropped and
+recreated, so point TEST_POSTGRES_URL at a disposable database:
+
+    TEST_POSTGRES_URL=postgresql://... python -m unittest tests.test_checkpoint_retention
+"""
+
+import os
+import time
+import unittest
+from unittest import mock
+
+from langgraph.checkpoint.base import empty_checkpoint
+
+import checkpoint_retention
+from checkpoint_retention import CheckpointRetention, checkpoint_id_at
+
+TEST_POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+
+@unittest.skipUnless(TEST_POSTGRES_URL, "TEST_POSTGRES_URL not set")
+class RetentionTestCase(unittest.TestCase):
+    def setUp(self):
+        from postgres_connector import PostgresCheckpointer
+
+        saver = PostgresCheckpointer(TEST_POSTGRES_URL, setup=False)
+        with saver.pool.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("DROP TABLE IF EXISTS checkpoints, checkpoint_writes, checkpoint_blobs CASCADE")
+            conn.commit()
+        saver.close()
+        self.saver = PostgresCheckpointer(TEST_POSTGRES_URL)
+        self.addCleanup(self.saver.close)
+
+    def put(self, thread_id: str, step: int, ts: float) -> None:
+        """One checkpoint whose "x" channel changes every step; "y" is written once."""
+        checkpoint = empty_checkpoint()
+        checkpoint["id"] = checkpoint_id_at(ts)
+        checkpoint["channel_values"] = {"x": f"{thread_id}-{step}", "y": "const"}
+        checkpoint["channel_versions"] = {"x": f"{step + 1:032d}", "y": f"{1:032d}"}
+        new_versions = {"x": checkpoint["channel_versions"]["x"]}
+        if step == 0:
+            new_versions["y"] = checkpoint["channel_versions"]["y"]
+        config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+        self.saver.put(config, checkpoint, {"step": step}, new_versions)
+
+    def count(self, table: str) -> int:
+        with self.saver.pool.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(f"SELECT count(*) FROM {table}")
+                return cur.fetchone()[0]
+
+
+class PruneOrphansTest(RetentionTestCase):
+    def test_active_thread_blobs_swept_once_idle(self):
+        now = time.time()
+        for step in range(10):
+            self.put("active", step, now - 10 + step)
+        retention = CheckpointRetention(self.saver, keep_last=2, blob_grace=600)
+
+        stats = retention.run_once()
+        self.assertEqual(self.count("checkpoints"), 2)
+        self.assertEqual(stats["blobs_deleted"], 0)  # still within blob_grace
+        self.assertEqual(stats["blob_sweeps_pending"], 1)
+        self.assertEqual(self.count("checkpoint_blobs"), 11)
+
+        # nothing new to prune, but the deferred thread is swept once it has gone idle
+        with mock.patch.object(checkpoint_retention.time, "time", return_value=now + 601):
+            stats = retention.run_once()
+        self.assertEqual(stats["checkpoints_deleted"], 8)
+        self.assertEqual(stats["blob_sweeps_pending"], 0)
+        self.assertEqual(self.count("checkpoint_blobs"), 3)  # x@9, x@10 and y@1
+
+        config = {"configurable": {"thread_id": "active", "checkpoint_ns": ""}}
+        values = self.saver.get_tuple(config).checkpoint["channel_values"]
+        self.assertEqual(values, {"x": "active-9", "y": "const"})
+
+
+class PartitionTest(RetentionTestCase):
+    def relkinds(self) -> dict:
+        with self.saver.pool.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT relname, relkind FROM pg_class WHERE relname IN ('checkpoints', 'checkpoint_writes')")
+                return dict(cur.fetchall())
+
+    def test_background_pass_never_converts(self):
+        retention = CheckpointRetention(self.saver, partition_days=7)
+        stats = retention.run_once()
+        self.assertEqual(stats["errors"], 0)
+        self.assertEqual(stats["partitions_created"], 0)
+        self.assertEqual(self.relkinds(), {"checkpoints": "r", "checkpoint_writes": "r"})
+
+        self.assertTrue(retention.partition(convert=True))
+        self.assertEqual(self.relkinds(), {"checkpoints": "p", "checkpoint_writes": "p"})
+        self.assertEqual(retention.run_once()["errors"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
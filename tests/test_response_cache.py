@@ -0,0 +1,37 @@
+import unittest
+
+from response_cache import ResponseCache
+
+
+class BagOfWordsEmbeddings:
+    """Stand-in embedding model: one dimension per vocabulary word."""
+
+    def __init__(self, vocabulary):
+        self.vocabulary = vocabulary
+
+    def embed_query(self, text):
+        words = text.split()
+        return [float(words.count(word)) for word in self.vocabulary]
+
+
+class ResponseCacheTest(unittest.TestCase):
+    def test_without_embeddings_only_normalized_text_hits(self):
+        cache = ResponseCache()
+        cache.put("I am anxious about exams", "exposure exercise")
+        self.assertEqual(cache.get("i am anxious about exams!"), "exposure exercise")
+        self.assertIsNone(cache.get("i am not anxious about exams"))
+        self.assertIsNone(cache.get("a better sleep schedule please"))
+        self.assertEqual(cache.stats()["similar_hits"], 0)
+
+    def test_similar_hit_needs_matching_negations(self):
+        embeddings = BagOfWordsEmbeddings(["anxious", "about", "exams", "really"])
+        cache = ResponseCache(threshold=0.8, embeddings=embeddings)
+        cache.put("i am anxious about exams", "exposure exercise")
+        self.assertEqual(cache.get("really anxious about exams"), "exposure exercise")
+        self.assertIsNone(cache.get("i am not anxious about exams"))
+        self.assertIsNone(cache.get("i don't feel anxious about exams"))
+        self.assertEqual(cache.stats()["similar_hits"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()